@@ -161,6 +161,13 @@ function makeWsUrl(sessionId: string): string {
   }
 }
 
+const frameDecoder = new TextDecoder();
+
+// The API sends every stream event as a binary frame of UTF-8 JSON; text frames are still accepted.
+function decodeFrame(data: unknown): string {
+  return typeof data === "string" ? data : frameDecoder.decode(data as ArrayBuffer);
+}
+
 function formatTimestamp(iso?: string | null): string {
   if (!iso) return "—";
   try {
@@ -325,6 +332,7 @@ export default function Home() {
     (sessionId: string) => {
       closeStream();
       const ws = new WebSocket(makeWsUrl(sessionId));
+      ws.binaryType = "arraybuffer";
       wsRef.current = ws;
       setWsStatus("connecting");
       ws.onopen = () => {
@@ -333,7 +341,7 @@ export default function Home() {
       };
       ws.onmessage = (messageEvent) => {
         try {
-          const data = JSON.parse(messageEvent.data as string) as StreamEvent;
+          const data = JSON.parse(decodeFrame(messageEvent.data)) as StreamEvent;
           handleStreamEvent(data);
         } catch (error) {
           appendLog("error", `Failed to parse stream event: ${String(error)}`);
@@ -1,6 +1,11 @@
+import os
+
 from crewai import Agent, Task
 from .llm import get_llm
 
+# CrewAI's verbose mode formats and prints every prompt/response; opt in for debugging only
+VERBOSE = os.getenv("CREWTALK_VERBOSE", "0") == "1"
+
 # Lightweight, role-based agents with per-agent model_hint
 
 def make_moderator(model_hint: str | None = None):
@@ -11,7 +16,7 @@ def make_moderator(model_hint: str | None = None):
               "write concise prompts and summaries; ask for confidence (0-1)."),
         backstory=("An experienced and neutral facilitator with a deep understanding of "
                    "conflict resolution and clear communication protocols."),
-        verbose=True,
+        verbose=VERBOSE,
         llm=llm_instance,
     )
 
@@ -26,14 +31,14 @@ def make_participant(name: str, trait: str, model_hint: str | None = None):
         "domain_expert": "Practitioner who brings real-world constraints and best practices.",
         "risk_analyst": "Veteran risk analyst tasked with spotting hidden pitfalls early.",
     }.get(trait, "Collaborator invited for balanced, thoughtful contributions.")
-    return Agent(role=name, goal=style, backstory=backstory, verbose=True, llm=get_llm(model_hint))
+    return Agent(role=name, goal=style, backstory=backstory, verbose=VERBOSE, llm=get_llm(model_hint))
 
 def make_notetaker(model_hint: str | None = None):
     return Agent(
         role="NoteTaker",
         goal=("Distill bullet points; extract decisions; end with TODO: lines; keep under 120 words."),
         backstory="Expert meeting scribe focused on capturing just the essentials.",
-        verbose=False,
+        verbose=VERBOSE,
         llm=get_llm(model_hint),
     )
 
@@ -1,10 +1,71 @@
+from typing import Any, List, Optional
+
+import asyncpg
 from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import DBAPIError
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+psycopg://postgres:dev@db:5432/crewtalk")
-engine = create_engine(DATABASE_URL, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE_SEC = int(os.getenv("DB_POOL_RECYCLE_SEC", "1800"))
+DB_POOL_TIMEOUT_SEC = float(os.getenv("DB_POOL_TIMEOUT_SEC", "5"))
+# asyncpg closes connections idle this long; keep it under common NAT/LB idle timeouts
+DB_POOL_IDLE_SEC = float(os.getenv("DB_POOL_IDLE_SEC", "300"))
+
+engine = create_engine(
+    DATABASE_URL,
+    future=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=DB_POOL_RECYCLE_SEC,
+    pool_timeout=DB_POOL_TIMEOUT_SEC,
+)
+
+# Runtime queries go through asyncpg; the SQLAlchemy engine above is only used for DDL.
+POOL: Optional[asyncpg.Pool] = None
+
+
+def _asyncpg_dsn(url: str) -> str:
+    # asyncpg does not understand SQLAlchemy driver suffixes like `postgresql+psycopg://`
+    scheme, sep, rest = url.partition("://")
+    return f"{scheme.split('+', 1)[0]}{sep}{rest}"
+
+
+async def init_pool() -> asyncpg.Pool:
+    global POOL
+    if POOL is None:
+        # Mirror the SQLAlchemy sizing: DB_POOL_SIZE steady connections plus DB_MAX_OVERFLOW burst,
+        # with idle connections retired before NATs/load-balancers silently drop them. `timeout`
+        # here only bounds connecting; checkout waits are bounded in db_acquire().
+        POOL = await asyncpg.create_pool(
+            _asyncpg_dsn(DATABASE_URL),
+            min_size=min(5, DB_POOL_SIZE),
+            max_size=DB_POOL_SIZE + DB_MAX_OVERFLOW,
+            max_inactive_connection_lifetime=DB_POOL_IDLE_SEC,
+            timeout=DB_POOL_TIMEOUT_SEC,
+        )
+    return POOL
+
+
+async def close_pool() -> None:
+    global POOL
+    if POOL is not None:
+        await POOL.close()
+        POOL = None
+
+
+def db_acquire() -> Any:
+    """Pool checkout bounded by DB_POOL_TIMEOUT_SEC, like SQLAlchemy's pool_timeout."""
+
+    return get_pool().acquire(timeout=DB_POOL_TIMEOUT_SEC)
+
+
+def get_pool() -> asyncpg.Pool:
+    if POOL is None:
+        raise RuntimeError("database pool not initialized; call init_pool() at startup")
+    return POOL
 
 DDL = [
     """
@@ -32,6 +93,7 @@ DDL = [
       trait text,
       model_hint text,
       is_active boolean default true,
+      probe_status text,
       created_at timestamptz default now()
     );
     """,
@@ -58,6 +120,14 @@ DDL = [
     );
     """,
     """
+    create table if not exists notepads (
+      session_id uuid primary key references sessions(id) on delete cascade,
+      content text not null,
+      updated_by text,
+      updated_at timestamptz default now()
+    );
+    """,
+    """
     create table if not exists rewards (
       id bigserial primary key,
       session_id uuid references sessions(id) on delete cascade,
@@ -68,32 +138,42 @@ DDL = [
     """,
 ]
 
+
+# Columns and indexes that may have been missing on older databases
+MIGRATIONS = [
+    "ALTER TABLE sessions ADD COLUMN IF NOT EXISTS status text not null default 'idle'",
+    "ALTER TABLE sessions ADD COLUMN IF NOT EXISTS turn_index int not null default 0",
+    "ALTER TABLE sessions ADD COLUMN IF NOT EXISTS deadline timestamptz",
+    "ALTER TABLE messages ADD COLUMN IF NOT EXISTS turn_index int not null default 0",
+    "CREATE INDEX IF NOT EXISTS idx_messages_session_created ON messages (session_id, created_at)",
+    # The ascending index already serves newest-first reads with a backward scan; a DESC copy
+    # only adds write cost to every message insert
+    "DROP INDEX IF EXISTS idx_messages_session_created_desc",
+    "CREATE INDEX IF NOT EXISTS idx_agents_session ON agents (session_id)",
+    (
+        "CREATE INDEX IF NOT EXISTS idx_notepad_session_created "
+        "ON notepad_snapshots (session_id, created_at)"
+    ),
+    "CREATE INDEX IF NOT EXISTS idx_rewards_session ON rewards (session_id)",
+    "ALTER TABLE agents ADD COLUMN IF NOT EXISTS created_at timestamptz default now()",
+    "UPDATE agents SET created_at = COALESCE(created_at, now()) WHERE created_at IS NULL",
+    "ALTER TABLE agents ADD COLUMN IF NOT EXISTS probe_status text",
+]
+
+
+def _startup_statements() -> List[str]:
+    statements = ["CREATE EXTENSION IF NOT EXISTS pgcrypto", *DDL, *MIGRATIONS]
+    return [stmt.strip().rstrip(";") for stmt in statements]
+
+
 def init_db():
-    with engine.begin() as conn:
-        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pgcrypto"))
-        for stmt in DDL:
-            conn.execute(text(stmt))
-        # Columns that may have been missing on older databases
-        conn.execute(text("ALTER TABLE sessions ADD COLUMN IF NOT EXISTS status text not null default 'idle'"))
-        conn.execute(text("ALTER TABLE sessions ADD COLUMN IF NOT EXISTS turn_index int not null default 0"))
-        conn.execute(text("ALTER TABLE sessions ADD COLUMN IF NOT EXISTS deadline timestamptz"))
-        conn.execute(text("ALTER TABLE messages ADD COLUMN IF NOT EXISTS turn_index int not null default 0"))
-        conn.execute(
-            text(
-                "CREATE INDEX IF NOT EXISTS idx_messages_session_created "
-                "ON messages (session_id, created_at)"
-            )
-        )
-        conn.execute(
-            text("CREATE INDEX IF NOT EXISTS idx_agents_session ON agents (session_id)")
-        )
-        conn.execute(
-            text(
-                "ALTER TABLE agents ADD COLUMN IF NOT EXISTS created_at timestamptz default now()"
-            )
-        )
-        conn.execute(
-            text(
-                "UPDATE agents SET created_at = COALESCE(created_at, now()) WHERE created_at IS NULL"
-            )
-        )
+    statements = _startup_statements()
+    try:
+        # Single simple-protocol exchange for the whole schema bootstrap
+        with engine.begin() as conn:
+            conn.exec_driver_sql(";\n".join(statements))
+    except DBAPIError:
+        # Some drivers refuse multi-statement strings; replay one statement at a time
+        with engine.begin() as conn:
+            for stmt in statements:
+                conn.execute(text(stmt))
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import AsyncIterator, Dict, List, Optional
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
 import litellm
 
@@ -12,8 +13,14 @@ async def stream_chat(
     base_url: Optional[str] = None,
     temperature: float = 0.2,
     stop: Optional[List[str]] = None,
+    cache_key: Optional[str] = None,
 ) -> AsyncIterator[str]:
-    """Stream text deltas from LiteLLM."""
+    """Stream text deltas from LiteLLM.
+
+    `cache_key` (the session id) is attached as request metadata so a LiteLLM router/proxy
+    can pin all of a session's traffic to one replica, where its shared prompt prefix is
+    already in the KV cache.
+    """
 
     kwargs: Dict[str, object] = {
         "model": model,
@@ -25,15 +32,123 @@ async def stream_chat(
         kwargs["stop"] = stop
     if base_url:
         kwargs["base_url"] = base_url
+    if cache_key:
+        kwargs["metadata"] = {"session_id": cache_key}
 
     stream = await litellm.acompletion(**kwargs)
+    content_of: Optional[Callable[[Any], Optional[str]]] = None
     async for chunk in stream:
         if not chunk:
             continue
-        choices = chunk.get("choices")
-        if not choices:
+        if content_of is None:
+            # LiteLLM yields attribute-style ModelResponse chunks; plain dicts are the fallback.
+            content_of = _attr_content if hasattr(chunk, "choices") else _key_content
+        try:
+            text_delta = content_of(chunk)
+        except (AttributeError, IndexError, KeyError, TypeError):
             continue
-        delta = choices[0].get("delta") or {}
-        text_delta = delta.get("content")
         if text_delta:
             yield text_delta
+
+
+async def stream_chat_coalesced(
+    model: str,
+    messages: List[Dict[str, str]],
+    *,
+    flush_every_ms: int = 15,
+    flush_bytes: int = 64,
+    **kwargs: Any,
+) -> AsyncIterator[str]:
+    """`stream_chat`, but tiny deltas are merged into larger chunks (see `coalesce_deltas`)."""
+
+    async for text in coalesce_deltas(
+        stream_chat(model, messages, **kwargs),
+        flush_every_ms=flush_every_ms,
+        flush_bytes=flush_bytes,
+    ):
+        yield text
+
+
+async def coalesce_deltas(
+    source: AsyncIterator[str],
+    *,
+    flush_every_ms: int = 15,
+    flush_bytes: int = 64,
+) -> AsyncIterator[str]:
+    """Merge deltas until `flush_bytes` characters are buffered or the oldest buffered
+    delta is `flush_every_ms` old, whichever comes first."""
+
+    loop = asyncio.get_running_loop()
+    interval = flush_every_ms / 1000
+    iterator = source.__aiter__()
+    parts: List[str] = []
+    buffered = 0
+    flush_at: Optional[float] = None
+    # Awaited via asyncio.wait so a time-based flush never cancels the upstream read.
+    next_delta = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            timeout = None if flush_at is None else max(0.0, flush_at - loop.time())
+            done, _ = await asyncio.wait({next_delta}, timeout=timeout)
+            if not done:
+                yield "".join(parts)
+                parts.clear()
+                buffered = 0
+                flush_at = None
+                continue
+            try:
+                delta = next_delta.result()
+            except StopAsyncIteration:
+                break
+            next_delta = asyncio.ensure_future(iterator.__anext__())
+            parts.append(delta)
+            buffered += len(delta)
+            if flush_at is None:
+                flush_at = loop.time() + interval
+            if buffered >= flush_bytes:
+                yield "".join(parts)
+                parts.clear()
+                buffered = 0
+                flush_at = None
+        if parts:
+            yield "".join(parts)
+    finally:
+        if not next_delta.done():
+            next_delta.cancel()
+
+
+def _attr_content(chunk: Any) -> Optional[str]:
+    return chunk.choices[0].delta.content
+
+
+def _key_content(chunk: Any) -> Optional[str]:
+    return (chunk["choices"][0].get("delta") or {}).get("content")
+
+
+def stream_chat_batch(
+    model: str,
+    prompts: List[List[Dict[str, str]]],
+    *,
+    base_url: Optional[str] = None,
+    temperature: float = 0.2,
+    stop: Optional[List[str]] = None,
+    cache_key: Optional[str] = None,
+) -> List[AsyncIterator[str]]:
+    """Open one delta stream per prompt for concurrent consumption.
+
+    LiteLLM has no multi-conversation streaming call, so batching happens server side:
+    when the returned streams are consumed concurrently (e.g. via `asyncio.gather`) the
+    requests arrive together and Ollama/vLLM schedule them into shared forward passes.
+    """
+
+    return [
+        stream_chat(
+            model,
+            messages,
+            base_url=base_url,
+            temperature=temperature,
+            stop=stop,
+            cache_key=cache_key,
+        )
+        for messages in prompts
+    ]
@@ -1,9 +1,171 @@
 import asyncio
-from typing import Any, Dict, Iterable, List, Optional
+import datetime as dt
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from asyncpg import Connection
+
+from ..db import db_acquire
+
+logger = logging.getLogger(__name__)
+
+SESSION_CACHE_TTL_SEC = 1.0
+SESSION_CACHE_SIZE = 1024
+WRITE_BATCH_MAX = 100
+
+
+# Statements are module constants so every call sends byte-identical text and hits
+# asyncpg's per-connection prepared-statement cache.
+_SQL_CREATE_SESSION = """
+insert into sessions (title, problem_statement, time_limit_sec, strategy)
+values ($1, $2, $3, $4)
+returning id, title, problem_statement, time_limit_sec, strategy, phase, status, deadline
+"""
+
+_SQL_GET_SESSION = """
+select id, title, problem_statement, strategy, phase, status,
+       time_limit_sec, turn_index, deadline, started_at, ended_at
+from sessions
+where id = $1
+"""
+
+_SQL_GET_SESSION_STATUS = """
+select status, phase, turn_index, deadline
+from sessions
+where id = $1
+"""
+
+_SQL_ADD_AGENT = """
+insert into agents (session_id, name, role, trait, model_hint, probe_status)
+values ($1, $2, $3, $4, $5, $6)
+returning id, session_id, name, role, trait, model_hint, is_active, probe_status, created_at
+"""
+
+_SQL_LIST_AGENTS = """
+select id, session_id, name, role, trait, model_hint, is_active, probe_status, created_at
+from agents
+where session_id = $1
+order by created_at asc
+"""
+
+_SQL_SET_AGENT_PROBE = """
+update agents set probe_status = $2, is_active = $3 where id = $1
+"""
+
+# Scores bind as float8 and are cast server-side: asyncpg's numeric encoder would otherwise
+# store the float's exact binary expansion (0.82 -> 0.8199999999999999511...).
+_SQL_SAVE_MESSAGES_RETURNING = """
+insert into messages (session_id, agent_id, phase, turn_index, text, sentiment, confidence)
+select session_id, agent_id, phase, turn_index, text, sentiment::numeric, confidence::numeric
+from unnest(
+  $1::uuid[], $2::uuid[], $3::text[], $4::int[], $5::text[], $6::float8[], $7::float8[]
+) as u(session_id, agent_id, phase, turn_index, text, sentiment, confidence)
+returning id, session_id, turn_index
+"""
+
+_SQL_RECENT_MESSAGES = """
+select * from (
+  select id, session_id, agent_id, phase, turn_index, text, sentiment, confidence, created_at
+  from messages
+  where session_id = $1
+  order by created_at desc, id desc
+  limit $2
+) recent
+order by created_at asc, id asc
+"""
+
+_SQL_MESSAGES_AFTER = """
+select id, session_id, agent_id, phase, turn_index, text, sentiment, confidence, created_at
+from messages
+where session_id = $1 and id > $3
+order by id asc
+limit $2
+"""
+
+_SQL_LIST_MESSAGES = """
+select id, session_id, agent_id, phase, turn_index, text, sentiment, confidence, created_at
+from messages
+where session_id = $1
+order by created_at asc, id asc
+"""
+
+_SQL_LIST_MESSAGES_JSON = """
+select coalesce(jsonb_agg(to_jsonb(m) order by m.created_at, m.id), '[]'::jsonb)
+from (
+  select id, session_id, agent_id, phase, turn_index, text, sentiment, confidence, created_at
+  from messages
+  where session_id = $1
+) m
+"""
+
+_SQL_LIST_MESSAGES_META = """
+select id, agent_id, phase, turn_index, sentiment, confidence, created_at
+from messages
+where session_id = $1
+order by created_at asc, id asc
+"""
+
+# Upsert the one-row-per-session current notepad and append to the history in one statement
+_SQL_SAVE_NOTEPAD_SNAPSHOT = """
+with current_notepad as (
+  insert into notepads (session_id, content, updated_by)
+  values ($1, $2, $3)
+  on conflict (session_id) do update
+    set content = excluded.content, updated_by = excluded.updated_by, updated_at = now()
+)
+insert into notepad_snapshots (session_id, content, updated_by)
+values ($1, $2, $3)
+"""
+
+_SQL_GET_CURRENT_NOTEPAD = """
+select session_id, content, updated_by, updated_at
+from notepads
+where session_id = $1
+"""
+
+_SQL_LIST_NOTEPAD_SNAPSHOTS = """
+select id, session_id, content, updated_by, created_at
+from notepad_snapshots
+where session_id = $1
+order by created_at asc
+"""
+
+
+@asynccontextmanager
+async def _connection(conn: Optional[Connection] = None) -> AsyncIterator[Connection]:
+    if conn is not None:
+        yield conn
+        return
+    async with db_acquire() as acquired:
+        yield acquired
+
+
+# Session ids updated inside an open repo_tx, keyed by id(conn); evicted again once it ends
+_TX_EVICTIONS: Dict[int, Set[str]] = {}
+
+
+@asynccontextmanager
+async def repo_tx() -> AsyncIterator[Connection]:
+    """One pooled connection and transaction shared across several repo calls.
 
-from sqlalchemy import text
+    Pass the yielded connection as `conn=` to run those calls on it.
+    """
 
-from ..db import SessionLocal
+    async with db_acquire() as conn:
+        _TX_EVICTIONS[id(conn)] = evict = set()
+        try:
+            async with conn.transaction():
+                yield conn
+        finally:
+            del _TX_EVICTIONS[id(conn)]
+            # Readers outside the transaction may have cached the pre-commit row meanwhile
+            for session_id in evict:
+                _SESSION_CACHE.pop(session_id, None)
 
 
 def _dictify(row: Any) -> Dict[str, Any]:
@@ -17,50 +179,84 @@ def _dictify(row: Any) -> Dict[str, Any]:
 
 
 async def create_session(
-    title: str, problem_statement: str, time_limit_sec: int, strategy: str
+    title: str,
+    problem_statement: str,
+    time_limit_sec: int,
+    strategy: str,
+    *,
+    conn: Optional[Connection] = None,
 ) -> Dict[str, Any]:
-    def _create() -> Dict[str, Any]:
-        with SessionLocal() as session:
-            result = session.execute(
-                text(
-                    """
-                    insert into sessions (title, problem_statement, time_limit_sec, strategy)
-                    values (:title, :problem_statement, :time_limit_sec, :strategy)
-                    returning id, title, problem_statement, time_limit_sec, strategy, phase, status, deadline
-                    """
-                ),
-                {
-                    "title": title,
-                    "problem_statement": problem_statement,
-                    "time_limit_sec": time_limit_sec,
-                    "strategy": strategy,
-                },
-            )
-            row = result.mappings().one()
-            session.commit()
-            return dict(row)
-
-    return await asyncio.to_thread(_create)
-
-
-async def get_session(session_id: str) -> Optional[Dict[str, Any]]:
-    def _get() -> Optional[Dict[str, Any]]:
-        with SessionLocal() as session:
-            result = session.execute(
-                text(
-                    """
-                    select id, title, problem_statement, strategy, phase, status,
-                           time_limit_sec, turn_index, deadline, started_at, ended_at
-                    from sessions
-                    where id = :session_id
-                    """
-                ),
-                {"session_id": session_id},
-            )
-            row = result.mappings().one_or_none()
-            return dict(row) if row else None
-
-    return await asyncio.to_thread(_get)
+    async with _connection(conn) as conn:
+        row = await conn.fetchrow(
+            _SQL_CREATE_SESSION,
+            title,
+            problem_statement,
+            time_limit_sec,
+            strategy,
+        )
+    return _dictify(row)
+
+
+# Per-process read-through cache; update_session invalidates, the TTL bounds
+# staleness for writes made by other workers, and the size cap bounds memory (LRU).
+_SESSION_CACHE: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+
+def _cache_session(session_id: str, record: Dict[str, Any]) -> None:
+    _SESSION_CACHE[session_id] = (time.monotonic(), record)
+    _SESSION_CACHE.move_to_end(session_id)
+    if len(_SESSION_CACHE) > SESSION_CACHE_SIZE:
+        _SESSION_CACHE.popitem(last=False)
+
+
+async def get_session(
+    session_id: str, *, conn: Optional[Connection] = None
+) -> Optional[Dict[str, Any]]:
+    cached = _SESSION_CACHE.get(session_id)
+    # a caller-supplied connection means a transaction that wants a consistent read
+    if conn is None and cached and time.monotonic() - cached[0] < SESSION_CACHE_TTL_SEC:
+        return dict(cached[1])
+
+    in_tx = conn is not None
+    async with _connection(conn) as conn:
+        row = await conn.fetchrow(_SQL_GET_SESSION, session_id)
+    if not row:
+        _SESSION_CACHE.pop(session_id, None)
+        return None
+    record = _dictify(row)
+    if not in_tx:  # a transaction's view may be uncommitted; never publish it to the cache
+        _cache_session(session_id, record)
+    return dict(record)
+
+
+async def get_session_status_lite(
+    session_id: str, *, conn: Optional[Connection] = None
+) -> Optional[Tuple[str, str, int, Optional[dt.datetime]]]:
+    """(status, phase, turn_index, deadline) for a session, or None if it does not exist."""
+
+    cached = _SESSION_CACHE.get(session_id)
+    if conn is None and cached and time.monotonic() - cached[0] < SESSION_CACHE_TTL_SEC:
+        record = cached[1]
+        return record["status"], record["phase"], record["turn_index"], record["deadline"]
+
+    async with _connection(conn) as conn:
+        row = await conn.fetchrow(_SQL_GET_SESSION_STATUS, session_id)
+    return tuple(row) if row else None
+
+
+# Update statements keyed by their column shape; `fields` is always built in the same
+# column order, so the tuple is a stable key and each shape maps to one prepared statement.
+_UPDATE_SQL_CACHE: Dict[Tuple[str, ...], str] = {}
+
+
+def _update_sql(columns: Tuple[str, ...]) -> str:
+    sql = _UPDATE_SQL_CACHE.get(columns)
+    if sql is None:
+        # $1 is reserved for the session id; assignments bind from $2 onward
+        assignments = ", ".join(f"{col} = ${idx}" for idx, col in enumerate(columns, start=2))
+        sql = f"update sessions set {assignments} where id = $1"
+        _UPDATE_SQL_CACHE[columns] = sql
+    return sql
 
 
 async def update_session(
@@ -69,8 +265,9 @@ async def update_session(
     phase: Optional[str] = None,
     status: Optional[str] = None,
     turn_index: Optional[int] = None,
-    deadline: Optional[str] = None,
-    ended_at: Optional[str] = None,
+    deadline: Optional[dt.datetime] = None,
+    ended_at: Optional[dt.datetime] = None,
+    conn: Optional[Connection] = None,
 ) -> None:
     fields: Dict[str, Any] = {}
     if phase is not None:
@@ -87,20 +284,12 @@ async def update_session(
     if not fields:
         return
 
-    assignments = ", ".join(f"{col} = :{col}" for col in fields.keys())
-    params = {"session_id": session_id, **fields}
-
-    def _update() -> None:
-        with SessionLocal() as session:
-            session.execute(
-                text(
-                    f"update sessions set {assignments} where id = :session_id"
-                ),
-                params,
-            )
-            session.commit()
-
-    await asyncio.to_thread(_update)
+    async with _connection(conn) as conn:
+        await conn.execute(_update_sql(tuple(fields)), session_id, *fields.values())
+        pending = _TX_EVICTIONS.get(id(conn))
+        if pending is not None:
+            pending.add(session_id)
+    _SESSION_CACHE.pop(session_id, None)
 
 
 async def add_agent(
@@ -109,49 +298,38 @@ async def add_agent(
     role: str,
     trait: Optional[str],
     model_hint: Optional[str],
+    *,
+    probe_status: Optional[str] = None,
+    conn: Optional[Connection] = None,
 ) -> Dict[str, Any]:
-    def _insert() -> Dict[str, Any]:
-        with SessionLocal() as session:
-            result = session.execute(
-                text(
-                    """
-                    insert into agents (session_id, name, role, trait, model_hint)
-                    values (:session_id, :name, :role, :trait, :model_hint)
-                    returning id, session_id, name, role, trait, model_hint, created_at
-                    """
-                ),
-                {
-                    "session_id": session_id,
-                    "name": name,
-                    "role": role,
-                    "trait": trait,
-                    "model_hint": model_hint,
-                },
-            )
-            row = result.mappings().one()
-            session.commit()
-            return dict(row)
-
-    return await asyncio.to_thread(_insert)
-
-
-async def list_agents(session_id: str) -> List[Dict[str, Any]]:
-    def _list() -> List[Dict[str, Any]]:
-        with SessionLocal() as session:
-            result = session.execute(
-                text(
-                    """
-                    select id, session_id, name, role, trait, model_hint, is_active, created_at
-                    from agents
-                    where session_id = :session_id
-                    order by created_at asc
-                    """
-                ),
-                {"session_id": session_id},
-            )
-            return [dict(row) for row in result.mappings().all()]
-
-    return await asyncio.to_thread(_list)
+    async with _connection(conn) as conn:
+        row = await conn.fetchrow(
+            _SQL_ADD_AGENT,
+            session_id,
+            name,
+            role,
+            trait,
+            model_hint,
+            probe_status,
+        )
+    return _dictify(row)
+
+
+async def set_agent_probe_result(
+    agent_id: str,
+    probe_status: str,
+    *,
+    is_active: bool,
+    conn: Optional[Connection] = None,
+) -> None:
+    async with _connection(conn) as conn:
+        await conn.execute(_SQL_SET_AGENT_PROBE, agent_id, probe_status, is_active)
+
+
+async def list_agents(session_id: str, *, conn: Optional[Connection] = None) -> List[Dict[str, Any]]:
+    async with _connection(conn) as conn:
+        rows = await conn.fetch(_SQL_LIST_AGENTS, session_id)
+    return [_dictify(row) for row in rows]
 
 
 async def save_message(
@@ -163,121 +341,265 @@ async def save_message(
     sentiment: Optional[float],
     confidence: Optional[float],
 ) -> int:
-    def _save() -> int:
-        with SessionLocal() as session:
-            result = session.execute(
-                text(
-                    """
-                    insert into messages (session_id, agent_id, phase, turn_index, text, sentiment, confidence)
-                    values (:session_id, :agent_id, :phase, :turn_index, :text, :sentiment, :confidence)
-                    returning id
-                    """
-                ),
-                {
-                    "session_id": session_id,
-                    "agent_id": agent_id,
-                    "phase": phase,
-                    "turn_index": turn_index,
-                    "text": message_text,
-                    "sentiment": sentiment,
-                    "confidence": confidence,
-                },
-            )
-            row = result.scalar_one()
-            session.commit()
-            return int(row)
-
-    return await asyncio.to_thread(_save)
-
-
-async def recent_messages(session_id: str, limit: int = 50) -> List[Dict[str, Any]]:
-    def _recent() -> List[Dict[str, Any]]:
-        with SessionLocal() as session:
-            result = session.execute(
-                text(
-                    """
-                    select id, session_id, agent_id, phase, turn_index, text, sentiment, confidence, created_at
-                    from messages
-                    where session_id = :session_id
-                    order by created_at desc
-                    limit :limit
-                    """
-                ),
-                {"session_id": session_id, "limit": limit},
-            )
-            rows = [dict(row) for row in result.mappings().all()]
-            rows.reverse()
-            return rows
-
-    return await asyncio.to_thread(_recent)
-
-
-async def list_messages(session_id: str) -> List[Dict[str, Any]]:
-    def _list() -> List[Dict[str, Any]]:
-        with SessionLocal() as session:
-            result = session.execute(
-                text(
-                    """
-                    select id, session_id, agent_id, phase, turn_index, text, sentiment, confidence, created_at
-                    from messages
-                    where session_id = :session_id
-                    order by created_at asc
-                    """
-                ),
-                {"session_id": session_id},
-            )
-            return [dict(row) for row in result.mappings().all()]
-
-    return await asyncio.to_thread(_list)
-
-
-async def save_notepad_snapshot(session_id: str, content: str, updated_by: Optional[str]) -> None:
-    def _save() -> None:
-        with SessionLocal() as session:
-            session.execute(
-                text(
-                    """
-                    insert into notepad_snapshots (session_id, content, updated_by)
-                    values (:session_id, :content, :updated_by)
-                    """
-                ),
-                {"session_id": session_id, "content": content, "updated_by": updated_by},
-            )
-            session.commit()
-
-    await asyncio.to_thread(_save)
-
-
-async def list_notepad_snapshots(session_id: str) -> List[Dict[str, Any]]:
-    def _list() -> List[Dict[str, Any]]:
-        with SessionLocal() as session:
-            result = session.execute(
-                text(
-                    """
-                    select id, session_id, content, updated_by, created_at
-                    from notepad_snapshots
-                    where session_id = :session_id
-                    order by created_at asc
-                    """
-                ),
-                {"session_id": session_id},
-            )
-            return [dict(row) for row in result.mappings().all()]
-
-    return await asyncio.to_thread(_list)
-
-
-async def export_session(session_id: str) -> Dict[str, Any]:
-    session_row = await get_session(session_id)
-    if not session_row:
-        raise ValueError("session not found")
-    agents = await list_agents(session_id)
-    messages = await list_messages(session_id)
-    notepad = await list_notepad_snapshots(session_id)
-    return {
-        "session": session_row,
-        "agents": agents,
-        "messages": messages,
-        "notepad_snapshots": notepad,
-        "rewards": [],
+    return await enqueue_message(
+        session_id,
+        agent_id,
+        phase,
+        turn_index,
+        message_text,
+        sentiment,
+        confidence,
+    )
+
+
+# --- Write-behind message writer ---------------------------------------------
+#
+# The engine enqueues finished turns; a single consumer inserts whatever is queued
+# in one statement and resolves each caller's future with its row id.
+
+_PendingMessage = Tuple[Dict[str, Any], "asyncio.Future[int]"]
+
+_write_q: Optional["asyncio.Queue[_PendingMessage]"] = None
+_writer_task: Optional[asyncio.Task] = None
+
+
+def start_message_writer() -> "asyncio.Queue[_PendingMessage]":
+    global _write_q, _writer_task
+    if _write_q is None:
+        _write_q = asyncio.Queue()
+    if not _writer_task or _writer_task.done():
+        _writer_task = asyncio.create_task(_message_writer(_write_q))
+    return _write_q
+
+
+async def stop_message_writer() -> None:
+    global _writer_task
+    if _writer_task and not _writer_task.done() and _write_q is not None:
+        # flush whatever the engines already handed off before tearing down
+        await _write_q.join()
+    if _writer_task:
+        _writer_task.cancel()
+        try:
+            await _writer_task
+        except asyncio.CancelledError:
+            pass
+        _writer_task = None
+
+
+def enqueue_message(
+    session_id: str,
+    agent_id: Optional[str],
+    phase: str,
+    turn_index: int,
+    message_text: str,
+    sentiment: Optional[float],
+    confidence: Optional[float],
+) -> "asyncio.Future[int]":
+    """Queue a message for the background writer; the future resolves to its id."""
+
+    queue = start_message_writer()
+    future: "asyncio.Future[int]" = asyncio.get_running_loop().create_future()
+    row = {
+        "session_id": session_id,
+        "agent_id": agent_id,
+        "phase": phase,
+        "turn_index": turn_index,
+        "text": message_text,
+        "sentiment": sentiment,
+        "confidence": confidence,
     }
+    queue.put_nowait((row, future))
+    return future
+
+
+async def _message_writer(queue: "asyncio.Queue[_PendingMessage]") -> None:
+    while True:
+        # No batching window: flush as soon as the queue is empty. Rows that arrive while a
+        # flush is in flight make up the next batch, so batches grow only under load.
+        batch = [await queue.get()]
+        while len(batch) < WRITE_BATCH_MAX:
+            try:
+                batch.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        try:
+            await _flush_or_isolate(batch)
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+
+async def _flush_or_isolate(batch: List[_PendingMessage]) -> None:
+    try:
+        await _flush_messages(batch)
+        return
+    except Exception as exc:
+        if len(batch) == 1:
+            logger.exception("Message writer failed to insert row: %s", exc)
+            _fail(batch, exc)
+            return
+        logger.warning("Message batch of %d rows failed (%s); retrying row by row", len(batch), exc)
+
+    # One bad row must not fail every session that shared the batch
+    for item in batch:
+        try:
+            await _flush_messages([item])
+        except Exception as exc:
+            logger.exception("Message writer failed to insert row: %s", exc)
+            _fail([item], exc)
+
+
+def _fail(batch: List[_PendingMessage], exc: BaseException) -> None:
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(exc)
+
+
+async def _flush_messages(batch: List[_PendingMessage]) -> None:
+    rows = [row for row, _ in batch]
+    async with db_acquire() as conn:
+        inserted = await conn.fetch(
+            _SQL_SAVE_MESSAGES_RETURNING,
+            [row["session_id"] for row in rows],
+            [row["agent_id"] for row in rows],
+            [row["phase"] for row in rows],
+            [row["turn_index"] for row in rows],
+            [row["text"] for row in rows],
+            [row["sentiment"] for row in rows],
+            [row["confidence"] for row in rows],
+        )
+
+    # RETURNING order is not contractual, so match ids back on (session, turn). Postgres accepts
+    # uppercase or unhyphenated sids from the URL, so compare them as parsed UUIDs.
+    ids: Dict[Tuple[uuid.UUID, int], Deque[int]] = defaultdict(deque)
+    for record in inserted:
+        ids[(uuid.UUID(str(record["session_id"])), record["turn_index"])].append(int(record["id"]))
+    for row, future in batch:
+        matches = ids.get((uuid.UUID(str(row["session_id"])), row["turn_index"]))
+        if future.done():
+            continue
+        if matches:
+            future.set_result(matches.popleft())
+        else:
+            future.set_exception(RuntimeError("message insert returned no id"))
+
+
+async def recent_messages(
+    session_id: str,
+    limit: int = 50,
+    *,
+    after_id: Optional[int] = None,
+    conn: Optional[Connection] = None,
+) -> List[Dict[str, Any]]:
+    """Latest `limit` messages oldest-first, or the next page after `after_id` when polling."""
+
+    async with _connection(conn) as conn:
+        if after_id is None:
+            rows = await conn.fetch(_SQL_RECENT_MESSAGES, session_id, limit)
+        else:
+            rows = await conn.fetch(_SQL_MESSAGES_AFTER, session_id, limit, after_id)
+    return [_dictify(row) for row in rows]
+
+
+async def list_messages(session_id: str, *, conn: Optional[Connection] = None) -> List[Dict[str, Any]]:
+    async with _connection(conn) as conn:
+        rows = await conn.fetch(_SQL_LIST_MESSAGES, session_id)
+    return [_dictify(row) for row in rows]
+
+
+async def list_messages_json(session_id: str, *, conn: Optional[Connection] = None) -> str:
+    """Same rows as `list_messages`, serialized by Postgres into a JSON array string.
+
+    For callers that forward the transcript as-is, this skips building Python dicts.
+    """
+
+    async with _connection(conn) as conn:
+        return await conn.fetchval(_SQL_LIST_MESSAGES_JSON, session_id)
+
+
+async def list_messages_meta(
+    session_id: str, *, conn: Optional[Connection] = None
+) -> List[Dict[str, Any]]:
+    """Message metadata without the `text` body, for callers that only need telemetry."""
+
+    async with _connection(conn) as conn:
+        rows = await conn.fetch(_SQL_LIST_MESSAGES_META, session_id)
+    return [_dictify(row) for row in rows]
+
+
+async def save_notepad_snapshot(
+    session_id: str,
+    content: str,
+    updated_by: Optional[str],
+    *,
+    conn: Optional[Connection] = None,
+) -> None:
+    async with _connection(conn) as conn:
+        await conn.execute(
+            _SQL_SAVE_NOTEPAD_SNAPSHOT,
+            session_id,
+            content,
+            updated_by,
+        )
+
+
+async def get_current_notepad(
+    session_id: str, *, conn: Optional[Connection] = None
+) -> Optional[Dict[str, Any]]:
+    async with _connection(conn) as conn:
+        row = await conn.fetchrow(_SQL_GET_CURRENT_NOTEPAD, session_id)
+    return _dictify(row) if row else None
+
+
+async def list_notepad_snapshots(
+    session_id: str, *, conn: Optional[Connection] = None
+) -> List[Dict[str, Any]]:
+    async with _connection(conn) as conn:
+        rows = await conn.fetch(_SQL_LIST_NOTEPAD_SNAPSHOTS, session_id)
+    return [_dictify(row) for row in rows]
+
+
+_SQL_EXPORT_SESSION = """
+select jsonb_build_object(
+  'session', (
+    select to_jsonb(s) from (
+      select id, title, problem_statement, strategy, phase, status,
+             time_limit_sec, turn_index, deadline, started_at, ended_at
+      from sessions
+      where id = $1
+    ) s
+  ),
+  'agents', coalesce((
+    select jsonb_agg(to_jsonb(a) order by a.created_at) from (
+      select id, session_id, name, role, trait, model_hint, is_active, probe_status, created_at
+      from agents
+      where session_id = $1
+    ) a
+  ), '[]'::jsonb),
+  'messages', coalesce((
+    select jsonb_agg(to_jsonb(m) order by m.created_at, m.id) from (
+      select id, session_id, agent_id, phase, turn_index, text, sentiment, confidence, created_at
+      from messages
+      where session_id = $1
+    ) m
+  ), '[]'::jsonb),
+  'notepad_snapshots', coalesce((
+    select jsonb_agg(to_jsonb(n) order by n.created_at) from (
+      select id, session_id, content, updated_by, created_at
+      from notepad_snapshots
+      where session_id = $1
+    ) n
+  ), '[]'::jsonb)
+)
+"""
+
+
+async def export_session(session_id: str, *, conn: Optional[Connection] = None) -> Dict[str, Any]:
+    # One round-trip: Postgres assembles the whole export document as JSONB
+    async with _connection(conn) as conn:
+        raw = await conn.fetchval(_SQL_EXPORT_SESSION, session_id)
+    payload = json.loads(raw) if raw else {}
+    if not payload.get("session"):
+        raise ValueError("session not found")
+    payload["rewards"] = []
+    return payload
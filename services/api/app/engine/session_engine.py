@@ -2,27 +2,44 @@ from __future__ import annotations
 
 import asyncio
 import datetime as dt
-import json
 import logging
 import os
 import re
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
 
+import orjson
 from redis import asyncio as aioredis
 
+try:
+    import re2 as _confidence_re
+except ImportError:  # google-re2 not installed
+    _confidence_re = re
+
 from ..llm import DEFAULT_MODEL, OLLAMA_URL
 from . import repo
-from .llm_stream import stream_chat
-from .strategy import DoubleDiamondPhase, get_phases, phase_prompt
+from .llm_stream import coalesce_deltas, stream_chat_batch, stream_chat_coalesced
+from .strategy import PHASE_INDEX, DoubleDiamondPhase, get_phases, phase_prompt
 from .ws import session_broadcaster
 
 logger = logging.getLogger(__name__)
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
-_redis = aioredis.from_url(REDIS_URL, decode_responses=True)
+# Binary replies: memory entries go straight to orjson and only the notepad is decoded
+_redis = aioredis.from_url(REDIS_URL)
 
 SHORT_TERM_LIMIT = 8
+MEMORY_PREVIEW_CHARS = 260
+NOTEPAD_PREVIEW_CHARS = 400
 NOTETAKER_INTERVAL = 2
+# Opt-in: participants sharing a model answer concurrently from the same context
+# (lets Ollama/vLLM batch their decoding) instead of hearing each other in turn.
+BATCH_PARTICIPANTS = os.getenv("CREWTALK_BATCH_PARTICIPANTS", "0") == "1"
+# How many participant turns may stream at once when not batching; 1 keeps them strictly in turn
+PARALLEL_AGENTS = max(1, int(os.getenv("CT_PARALLEL_AGENTS", "1")))
+# token.delta events are flushed at ~30 Hz or once this many characters are pending
+DELTA_FLUSH_CHARS = 64
+DELTA_FLUSH_INTERVAL_MS = 33
 
 
 POSITIVE_WORDS = {
@@ -61,7 +78,74 @@ HEDGE_WORDS = {
     "probably",
 }
 
-CONFIDENCE_RE = re.compile(r"confidence[:\s]+([01](?:\.\d+)?)", re.IGNORECASE)
+# RE2 matches in linear time with no backtracking; stdlib `re` is the fallback.
+CONFIDENCE_RE = _confidence_re.compile(r"(?i)confidence[:\s]+([01](?:\.\d+)?)")
+# Agents are asked to end with the confidence line, so look at the tail first.
+CONFIDENCE_TAIL_CHARS = 512
+
+SUMMARY_INSTRUCTION = "Provide a concise summary that transitions to the next phase."
+NOTEPAD_INSTRUCTION = "Update the shared notepad with key decisions and TODOs."
+TURN_INSTRUCTION = "Respond succinctly (<=120 words). Advance the team's progress."
+# Appended after the per-agent lines; the leading blank line matches the old joined output
+CONFIDENCE_SUFFIX = "\n\nState your confidence as `Confidence: <value between 0 and 1>`."
+WORD_RE = re.compile(r"[a-z']+")
+TRAILING_WORD_RE = re.compile(r"[a-z']+$")
+
+
+def _build_lexicon() -> Dict[str, Tuple[Tuple[int, str], ...]]:
+    """Map every surface form (word and plural) to the (category, word) entries it counts for."""
+
+    forms: Dict[str, List[Tuple[int, str]]] = {}
+    for category, words in enumerate((POSITIVE_WORDS, NEGATIVE_WORDS, HEDGE_WORDS)):
+        for word in words:
+            for form in (word, word + "s"):
+                forms.setdefault(form, []).append((category, word))
+    return {form: tuple(entries) for form, entries in forms.items()}
+
+
+_LEXICON = _build_lexicon()
+
+
+class _LexiconCounter:
+    """Distinct positive, negative and hedge words, accumulated delta by delta while streaming.
+
+    Whole-word matching (so "tissue" no longer counts as "issue"); plural forms are part of
+    the precomputed lexicon so "issues"/"concerns" still register. A trailing partial word is
+    held back until the next delta so words split across chunks are still seen whole.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Set[Tuple[int, str]] = set()
+        self._tail = ""
+
+    def feed(self, delta: str) -> None:
+        chunk = self._tail + delta.lower()
+        partial = TRAILING_WORD_RE.search(chunk)
+        if partial:
+            self._tail = chunk[partial.start():]
+            chunk = chunk[: partial.start()]
+        else:
+            self._tail = ""
+        self._scan(chunk)
+
+    def counts(self) -> Tuple[int, int, int]:
+        if self._tail:
+            self._scan(self._tail)
+            self._tail = ""
+        counts = [0, 0, 0]
+        for category, _ in self._entries:
+            counts[category] += 1
+        return counts[0], counts[1], counts[2]
+
+    def _scan(self, chunk: str) -> None:
+        # Tokenizing and the lexicon intersection run in C; Python only touches the hits.
+        for form in _LEXICON.keys() & WORD_RE.findall(chunk):
+            self._entries.update(_LEXICON[form])
+
+
+def _utcnow() -> dt.datetime:
+    # asyncpg binds timestamptz from aware datetimes only
+    return dt.datetime.now(dt.timezone.utc)
 
 
 class SessionEngine:
@@ -73,7 +157,15 @@ class SessionEngine:
         self.phase: str = "discover"
         self.turn_index: int = 0
         self.max_turns_per_phase = max_turns_per_phase
-        self.phase_deadline: Optional[dt.datetime] = None
+        self.phase_deadline: Optional[dt.datetime] = None  # wall clock, for payloads and the DB
+        self._phase_deadline_mono: Optional[float] = None  # event loop clock, for the cycle check
+        # System message shared by every turn of the current phase
+        self._system_msg: Dict[str, str] = {"role": "system", "content": phase_prompt(self.phase)}
+        # The engine is the only writer of its session's memories, so a local version counter
+        # tells us when the merged list we last read from Redis is still current.
+        self._mem_version = 0
+        self._mem_cache_version = -1
+        self._mem_cache: List[Dict[str, Any]] = []
 
         self._agents: List[Dict[str, Any]] = []
         self._moderator: Optional[Dict[str, Any]] = None
@@ -85,38 +177,57 @@ class SessionEngine:
         self._pause_event.set()
         self._stop_requested = False
         self._advance_requested = False
-        self._lock = asyncio.Lock()
+        # Guards start/pause/resume/stop against overlapping each other; the event loop is single
+        # threaded, so a plain flag checked and set before the first await is enough.
+        self._transitioning = False
+        self._turn_slots = asyncio.Semaphore(PARALLEL_AGENTS)
+        self._turn_lock = asyncio.Lock()  # keeps turn_index assignment ordered under parallel turns
+        self._status_frame_key: Optional[Tuple[Any, ...]] = None
+        self._status_frame = b""
 
     # --- Public controls -------------------------------------------------
 
+    @contextmanager
+    def _transition(self) -> Iterator[None]:
+        if self._transitioning:
+            raise RuntimeError("session control transition already in progress")
+        self._transitioning = True
+        try:
+            yield
+        finally:
+            self._transitioning = False
+
     async def start(self) -> None:
-        async with self._lock:
+        with self._transition():
             if self._task and not self._task.done():
                 raise RuntimeError("session already running")
 
-            meta = await repo.get_session(self.sid)
-            if not meta:
-                raise ValueError(f"Session {self.sid} not found")
-            agents = await repo.list_agents(self.sid)
-            self._configure_agents(agents)
-            if not self._moderator or not self._participants:
-                raise RuntimeError(
-                    "Session requires at least one moderator and one participant before starting"
-                )
-
-            self.status = "running"
-            self.phase = meta.get("phase", "discover")
-            self.turn_index = meta.get("turn_index", 0) or 0
-            self._stop_requested = False
-            self._advance_requested = False
-            self._pause_event.set()
+            # Read the session, its roster and flip it to running on one connection/transaction
+            async with repo.repo_tx() as conn:
+                meta = await repo.get_session(self.sid, conn=conn)
+                if not meta:
+                    raise ValueError(f"Session {self.sid} not found")
+                agents = await repo.list_agents(self.sid, conn=conn)
+                self._configure_agents(agents)
+                if not self._moderator or not self._participants:
+                    raise RuntimeError(
+                        "Session requires at least one moderator and one participant before starting"
+                    )
+
+                self.status = "running"
+                self.phase = meta.get("phase", "discover")
+                self.turn_index = meta.get("turn_index", 0) or 0
+                self._stop_requested = False
+                self._advance_requested = False
+                self._pause_event.set()
 
-            await repo.update_session(
-                self.sid,
-                status="running",
-                phase=self.phase,
-                turn_index=self.turn_index,
-            )
+                await repo.update_session(
+                    self.sid,
+                    status="running",
+                    phase=self.phase,
+                    turn_index=self.turn_index,
+                    conn=conn,
+                )
             await session_broadcaster.emit(
                 self.sid,
                 "session.status",
@@ -126,7 +237,7 @@ class SessionEngine:
             self._task = asyncio.create_task(self._run(meta))
 
     async def pause(self) -> None:
-        async with self._lock:
+        with self._transition():
             if self.status != "running":
                 return
             self.status = "paused"
@@ -139,7 +250,7 @@ class SessionEngine:
             )
 
     async def resume(self) -> None:
-        async with self._lock:
+        with self._transition():
             if self.status != "paused":
                 return
             self.status = "running"
@@ -152,7 +263,7 @@ class SessionEngine:
             )
 
     async def stop(self) -> None:
-        async with self._lock:
+        with self._transition():
             if self.status in {"done", "idle"} and not self._task:
                 return
             self._stop_requested = True
@@ -161,7 +272,7 @@ class SessionEngine:
             await repo.update_session(
                 self.sid,
                 status="done",
-                ended_at=dt.datetime.utcnow().isoformat(),
+                ended_at=_utcnow(),
             )
             await session_broadcaster.emit(
                 self.sid,
@@ -175,11 +286,45 @@ class SessionEngine:
         self._advance_requested = True
         self._pause_event.set()
 
+    @property
+    def is_running(self) -> bool:
+        """True while the orchestration task is alive (running or paused)."""
+
+        return self._task is not None and not self._task.done()
+
+    @property
+    def can_evict(self) -> bool:
+        """True when nothing is lost by dropping the engine: idle or done, with no task alive
+        and no control transition (such as a `start()` still awaiting the DB) in flight."""
+
+        return (
+            not self.is_running
+            and not self._transitioning
+            and self.status in {"idle", "done"}
+        )
+
+    def status_frame(self) -> bytes:
+        """Encoded `session.status` event for newly connected sockets.
+
+        Re-encoded only when status, phase, turn index or deadline changed since the last call,
+        so a burst of reconnecting clients shares one buffer.
+        """
+
+        key = (self.status, self.phase, self.turn_index, self.phase_deadline)
+        if key != self._status_frame_key:
+            self._status_frame = session_broadcaster.encode(
+                self.sid, "session.status", self._status_payload()
+            )
+            self._status_frame_key = key
+        return self._status_frame
+
     # --- Internal orchestration -----------------------------------------
 
     def _configure_agents(self, agents: List[Dict[str, Any]]) -> None:
         normalized: List[Dict[str, Any]] = []
         for agent in agents:
+            if agent.get("is_active") is False:  # e.g. its background probe failed
+                continue
             entry = dict(agent)
             if entry.get("id") is not None:
                 entry["id"] = str(entry["id"])
@@ -198,10 +343,7 @@ class SessionEngine:
             if strategy != "double_diamond":
                 logger.warning("Strategy %s unsupported, falling back to double_diamond", strategy)
             phases = get_phases(total_time)
-            current_phase_index = next(
-                (idx for idx, p in enumerate(phases) if p.name == self.phase),
-                0,
-            )
+            current_phase_index = PHASE_INDEX.get(self.phase, 0)
 
             for idx in range(current_phase_index, len(phases)):
                 phase = phases[idx]
@@ -231,7 +373,7 @@ class SessionEngine:
                 turn_index=self.turn_index,
                 phase=self.phase,
                 deadline=None,
-                ended_at=dt.datetime.utcnow().isoformat(),
+                ended_at=_utcnow(),
             )
             await session_broadcaster.emit(
                 self.sid,
@@ -242,12 +384,14 @@ class SessionEngine:
     async def _run_phase_loop(self, phase: DoubleDiamondPhase) -> None:
         previous_phase = self.phase
         self.phase = phase.name
-        now = dt.datetime.utcnow()
-        self.phase_deadline = now + dt.timedelta(seconds=phase.duration_sec)
+        self._system_msg = {"role": "system", "content": phase_prompt(phase.name)}
+        loop = asyncio.get_running_loop()
+        self._phase_deadline_mono = loop.time() + phase.duration_sec
+        self.phase_deadline = _utcnow() + dt.timedelta(seconds=phase.duration_sec)
         await repo.update_session(
             self.sid,
             phase=self.phase,
-            deadline=self.phase_deadline.isoformat(),
+            deadline=self.phase_deadline,
         )
         await session_broadcaster.emit(
             self.sid,
@@ -273,13 +417,20 @@ class SessionEngine:
                 logger.info("Session %s manual advance requested", self.sid)
                 self._advance_requested = False
                 break
-            if self.phase_deadline and dt.datetime.utcnow() > self.phase_deadline:
+            if self._phase_deadline_mono and loop.time() > self._phase_deadline_mono:
                 logger.info("Session %s phase %s reached deadline", self.sid, self.phase)
                 break
 
             await self._turn_for_agent(self._moderator, phase)
-            for participant in self._participants:
-                await self._turn_for_agent(participant, phase)
+            if BATCH_PARTICIPANTS:
+                await self._batched_turns(self._participants, phase)
+            elif PARALLEL_AGENTS > 1:
+                async with asyncio.TaskGroup() as tg:
+                    for participant in self._participants:
+                        tg.create_task(self._turn_for_agent(participant, phase))
+            else:
+                for participant in self._participants:
+                    await self._turn_for_agent(participant, phase)
 
             if self._note_taker and (cycles + 1) % NOTETAKER_INTERVAL == 0:
                 await self._turn_for_agent(self._note_taker, phase, notepad_mode=True)
@@ -302,23 +453,85 @@ class SessionEngine:
         notepad_mode: bool = False,
         summary_mode: bool = False,
     ) -> None:
+        async with self._turn_slots:
+            prepared = await self._prepare_turn(
+                agent,
+                phase,
+                notepad_mode=notepad_mode,
+                summary_mode=summary_mode,
+            )
+            if not prepared:
+                return
+            messages, turn_index = prepared
+            stream = stream_chat_coalesced(
+                self._model_for(agent),
+                messages,
+                base_url=OLLAMA_URL,
+                temperature=0.2,
+                cache_key=self.sid,
+                flush_every_ms=DELTA_FLUSH_INTERVAL_MS,
+                flush_bytes=DELTA_FLUSH_CHARS,
+            )
+            await self._complete_turn(agent, turn_index, stream)
+
+    async def _batched_turns(self, agents: List[Dict[str, Any]], phase: DoubleDiamondPhase) -> None:
+        """Run one turn for each agent, dispatching same-model prompts as a single batch.
+
+        Every agent in the batch sees the dialogue as it stood before the batch started.
+        """
+
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for agent in agents:
+            groups.setdefault(self._model_for(agent), []).append(agent)
+
+        for model, members in groups.items():
+            prepared: List[Tuple[Dict[str, Any], List[Dict[str, str]], int]] = []
+            for agent in members:
+                turn = await self._prepare_turn(agent, phase)
+                if turn:
+                    prepared.append((agent, *turn))
+            if not prepared:
+                continue
+            streams = stream_chat_batch(
+                model,
+                [messages for _, messages, _ in prepared],
+                base_url=OLLAMA_URL,
+                temperature=0.2,
+                cache_key=self.sid,
+            )
+            await asyncio.gather(
+                *(
+                    self._complete_turn(
+                        agent,
+                        turn_index,
+                        coalesce_deltas(
+                            stream,
+                            flush_every_ms=DELTA_FLUSH_INTERVAL_MS,
+                            flush_bytes=DELTA_FLUSH_CHARS,
+                        ),
+                    )
+                    for (agent, _, turn_index), stream in zip(prepared, streams)
+                )
+            )
+
+    async def _prepare_turn(
+        self,
+        agent: Optional[Dict[str, Any]],
+        phase: DoubleDiamondPhase,
+        *,
+        notepad_mode: bool = False,
+        summary_mode: bool = False,
+    ) -> Optional[Tuple[List[Dict[str, str]], int]]:
         if not agent or self._stop_requested:
-            return
+            return None
 
         await self._pause_event.wait()
         if self._stop_requested:
-            return
+            return None
         if self.status == "paused":
-            return
-
-        agent_id = agent["id"]
-        role = agent["role"]
-        trait = agent.get("trait") or ""
-        model_tag = agent.get("model_hint") or DEFAULT_MODEL
-        model = f"ollama/{model_tag}"
+            return None
 
-        memories = await self._collect_memories()
-        notepad = await _redis.get(self._notepad_key())
+        memories, notepad = await self._collect_context()
 
         user_prompt = self._build_prompt(
             agent=agent,
@@ -330,41 +543,47 @@ class SessionEngine:
         )
 
         messages = [
-            {
-                "role": "system",
-                "content": phase_prompt(phase.name),
-            },
+            self._system_msg,
             {
                 "role": "user",
                 "content": user_prompt,
             },
         ]
 
-        self.turn_index += 1
-        await repo.update_session(self.sid, turn_index=self.turn_index)
-        await session_broadcaster.emit(
-            self.sid,
-            "session.status",
-            self._status_payload(),
-        )
+        async with self._turn_lock:
+            self.turn_index += 1
+            turn_index = self.turn_index
+            await repo.update_session(self.sid, turn_index=turn_index)
+            await session_broadcaster.emit(
+                self.sid,
+                "session.status",
+                self._status_payload(),
+            )
+        return messages, turn_index
 
+    async def _complete_turn(
+        self,
+        agent: Dict[str, Any],
+        turn_index: int,
+        stream: AsyncIterator[str],
+    ) -> None:
+        agent_id = agent["id"]
         text_accum = ""
+        lexicon = _LexiconCounter()
+        delta_envelope = session_broadcaster.envelope(self.sid, "token.delta")
         try:
-            async for delta in stream_chat(
-                model,
-                messages,
-                base_url=OLLAMA_URL,
-                temperature=0.2,
-            ):
+            async for delta in stream:
                 text_accum += delta
+                lexicon.feed(delta)
                 await session_broadcaster.emit(
                     self.sid,
                     "token.delta",
                     {
                         "agent_id": agent_id,
-                        "turn_index": self.turn_index,
+                        "turn_index": turn_index,
                         "text_delta": delta,
                     },
+                    envelope=delta_envelope,
                 )
         except Exception as exc:
             logger.exception("LLM streaming failed for session %s agent %s: %s", self.sid, agent_id, exc)
@@ -383,20 +602,23 @@ class SessionEngine:
         if not text:
             text = "[no response]"
 
-        sentiment = self._sentiment_score(text)
-        confidence = self._confidence_score(text)
+        pos, neg, hedges = lexicon.counts()
+        sentiment = self._sentiment_score(pos, neg)
+        confidence = self._confidence_score(text, hedges)
 
-        message_id = await repo.save_message(
+        # Write-behind: the insert is batched in the background while Redis memory updates
+        pending_id = repo.enqueue_message(
             self.sid,
             agent_id,
             self.phase,
-            self.turn_index,
+            turn_index,
             text,
             sentiment,
             confidence,
         )
 
-        await self._append_memory(agent, text)
+        await self._append_memory(agent, text, turn_index)
+        message_id = await pending_id
 
         await session_broadcaster.emit(
             self.sid,
@@ -405,7 +627,7 @@ class SessionEngine:
                 "id": message_id,
                 "agent_id": agent_id,
                 "phase": self.phase,
-                "turn_index": self.turn_index,
+                "turn_index": turn_index,
                 "text": text,
                 "sentiment": sentiment,
                 "confidence": confidence,
@@ -424,48 +646,59 @@ class SessionEngine:
             "deadline": deadline_iso,
         }
 
+    def _model_for(self, agent: Dict[str, Any]) -> str:
+        return f"ollama/{agent.get('model_hint') or DEFAULT_MODEL}"
+
     def _notepad_key(self) -> str:
         return f"session:{self.sid}:notepad"
 
-    def _memory_key(self, agent_name: str) -> str:
-        return f"session:{self.sid}:scratch:{agent_name}"
-
-    async def _collect_memories(self) -> List[Dict[str, Any]]:
-        keys = [self._memory_key(agent["name"]) for agent in self._agents]
-        if not keys:
-            return []
-
-        async def _fetch(key: str) -> List[Dict[str, Any]]:
-            items = await _redis.lrange(key, 0, SHORT_TERM_LIMIT - 1)
-            if not items:
-                return []
-            parsed = []
-            for item in reversed(items):  # lpush stores newest first
-                try:
-                    parsed.append(json.loads(item))
-                except json.JSONDecodeError:
-                    continue
-            return parsed
-
-        results = await asyncio.gather(*(_fetch(key) for key in keys))
+    def _memory_key(self) -> str:
+        return f"session:{self.sid}:memory"
+
+    async def _collect_context(self) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Recent memories across all agents plus the notepad, in one Redis round-trip.
+
+        Every agent appends to one session-wide list, so it is already in chronological order.
+        """
+
+        if self._mem_cache_version == self._mem_version:
+            # No memory writes since the last read; only the notepad can have changed (via the API)
+            notepad = await _redis.get(self._notepad_key())
+            return self._mem_cache, notepad.decode() if notepad is not None else None
+
+        version = self._mem_version
+
+        # One pipelined flush for the shared memory LRANGE and the notepad GET; no MULTI/EXEC needed
+        pipe = _redis.pipeline(transaction=False)
+        pipe.lrange(self._memory_key(), 0, SHORT_TERM_LIMIT - 1)
+        pipe.get(self._notepad_key())
+        items, notepad = await pipe.execute()
+
         merged: List[Dict[str, Any]] = []
-        for entries in results:
-            merged.extend(entries)
-        merged = sorted(merged, key=lambda entry: entry.get("turn_index", 0))
-        return merged[-SHORT_TERM_LIMIT:]
-
-    async def _append_memory(self, agent: Dict[str, Any], text: str) -> None:
-        key = self._memory_key(agent["name"])
-        entry = json.dumps(
+        for item in reversed(items or []):  # lpush stores newest first
+            try:
+                merged.append(orjson.loads(item))
+            except orjson.JSONDecodeError:
+                continue
+        self._mem_cache = merged
+        self._mem_cache_version = version
+        return self._mem_cache, notepad.decode() if notepad is not None else None
+
+    async def _append_memory(self, agent: Dict[str, Any], text: str, turn_index: int) -> None:
+        key = self._memory_key()
+        entry = orjson.dumps(
             {
                 "agent": agent["name"],
                 "role": agent["role"],
-                "turn_index": self.turn_index,
+                "turn_index": turn_index,
                 "text": text,
             }
         )
-        await _redis.lpush(key, entry)
-        await _redis.ltrim(key, 0, SHORT_TERM_LIMIT - 1)
+        async with _redis.pipeline(transaction=False) as pipe:
+            pipe.lpush(key, entry)
+            pipe.ltrim(key, 0, SHORT_TERM_LIMIT - 1)
+            await pipe.execute()
+        self._mem_version += 1
 
     def _build_prompt(
         self,
@@ -477,49 +710,58 @@ class SessionEngine:
         notepad_mode: bool,
         summary_mode: bool,
     ) -> str:
-        lines = [
-            f"Session phase: {phase.name.upper()} — {phase.objective}",
-            f"You are {agent['name']} ({agent['role']}).",
-        ]
+        # Shared context first so every agent in the session sends an identical prefix the
+        # inference server can reuse from its KV cache; per-agent instructions go last.
+        recent = memories[-SHORT_TERM_LIMIT:]
         trait = agent.get("trait")
+        size = 3 + (1 + len(recent) if recent else 0) + (1 if notepad else 0) + (1 if trait else 0)
+        lines: List[str] = [""] * size
+
+        lines[0] = f"Session phase: {phase.name.upper()} — {phase.objective}"
+        i = 1
+        if recent:
+            lines[i] = "\nRecent dialogue:"
+            i += 1
+            for mem in recent:
+                text = mem.get("text", "")
+                if len(text) > MEMORY_PREVIEW_CHARS:
+                    text = text[:MEMORY_PREVIEW_CHARS]
+                lines[i] = f"- {mem.get('agent', 'unknown')}: {text}"
+                i += 1
+
+        if notepad:
+            preview = notepad.strip()
+            if len(preview) > NOTEPAD_PREVIEW_CHARS:
+                preview = preview[:NOTEPAD_PREVIEW_CHARS] + "…"
+            lines[i] = f"\nNotepad snapshot:\n{preview}"
+            i += 1
+
+        lines[i] = f"\nYou are {agent['name']} ({agent['role']})."
+        i += 1
         if trait:
-            lines.append(f"Trait guidance: {trait}.")
+            lines[i] = f"Trait guidance: {trait}."
+            i += 1
         if summary_mode:
-            lines.append("Provide a concise summary that transitions to the next phase.")
+            lines[i] = SUMMARY_INSTRUCTION
         elif notepad_mode:
-            lines.append("Update the shared notepad with key decisions and TODOs.")
+            lines[i] = NOTEPAD_INSTRUCTION
         else:
-            lines.append("Respond succinctly (<=120 words). Advance the team's progress.")
-
-        if memories:
-            lines.append("\nRecent dialogue:")
-            for mem in memories[-SHORT_TERM_LIMIT:]:
-                lines.append(f"- {mem.get('agent', 'unknown')}: {mem.get('text', '')[:260]}")
-
-        if notepad:
-            preview = notepad.strip()
-            if len(preview) > 400:
-                preview = preview[:400] + "…"
-            lines.append(f"\nNotepad snapshot:\n{preview}")
+            lines[i] = TURN_INSTRUCTION
 
-        lines.append("\nState your confidence as `Confidence: <value between 0 and 1>`.")
-        return "\n".join(lines)
+        return "\n".join(lines) + CONFIDENCE_SUFFIX
 
-    def _sentiment_score(self, text: str) -> float:
-        text_lower = text.lower()
-        pos = sum(1 for word in POSITIVE_WORDS if word in text_lower)
-        neg = sum(1 for word in NEGATIVE_WORDS if word in text_lower)
+    def _sentiment_score(self, pos: int, neg: int) -> float:
         if pos == neg == 0:
             return 0.0
         score = (pos - neg) / max(pos + neg, 1)
         return max(-1.0, min(1.0, score))
 
-    def _confidence_score(self, text: str) -> float:
-        match = CONFIDENCE_RE.search(text)
+    def _confidence_score(self, text: str, hedges: int) -> float:
+        match = CONFIDENCE_RE.search(text[-CONFIDENCE_TAIL_CHARS:])
+        if match is None and len(text) > CONFIDENCE_TAIL_CHARS:
+            match = CONFIDENCE_RE.search(text)
         user_conf = float(match.group(1)) if match else None
 
-        text_lower = text.lower()
-        hedges = sum(1 for word in HEDGE_WORDS if word in text_lower)
         auto_conf = max(0.0, min(1.0, 1.0 - 0.15 * hedges))
 
         if user_conf is not None:
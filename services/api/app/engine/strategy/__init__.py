@@ -1,3 +1,3 @@
-from .double_diamond import DoubleDiamondPhase, get_phases, phase_prompt
+from .double_diamond import PHASE_INDEX, DoubleDiamondPhase, get_phases, phase_prompt
 
-__all__ = ["DoubleDiamondPhase", "get_phases", "phase_prompt"]
+__all__ = ["DoubleDiamondPhase", "PHASE_INDEX", "get_phases", "phase_prompt"]
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 
 
 @dataclass(frozen=True)
@@ -17,9 +18,13 @@ PHASE_ORDER = [
     ("develop", "Generate solution concepts, stress test options, and refine promising ideas."),
     ("deliver", "Select a direction, outline execution steps, and call out success metrics."),
 ]
+# get_phases() always returns phases in PHASE_ORDER, so this indexes its result too
+PHASE_INDEX = {name: idx for idx, (name, _) in enumerate(PHASE_ORDER)}
 
 
-def get_phases(total_time_sec: int) -> List[DoubleDiamondPhase]:
+@lru_cache(maxsize=8)
+def get_phases(total_time_sec: int) -> Tuple[DoubleDiamondPhase, ...]:
+    # Cached per time limit, so return an immutable tuple callers cannot mutate in place
     total = max(total_time_sec, 120)
     base = total // len(PHASE_ORDER)
     remainder = total % len(PHASE_ORDER)
@@ -27,30 +32,31 @@ def get_phases(total_time_sec: int) -> List[DoubleDiamondPhase]:
     for idx, (name, objective) in enumerate(PHASE_ORDER):
         duration = base + (1 if idx < remainder else 0)
         phases.append(DoubleDiamondPhase(name=name, duration_sec=duration, objective=objective))
-    return phases
-
-
+    return tuple(phases)
+
+
+PHASE_PROMPTS = {
+    "discover": (
+        "You are facilitating the DISCOVER phase. Focus on gathering observations, "
+        "user pains, and unmet needs. Encourage clarifying questions and avoid jumping "
+        "to solutions yet."
+    ),
+    "define": (
+        "You are in the DEFINE phase. Summarize insights, frame the problem crisply, "
+        "and push the team toward a shared articulation of the target outcome."
+    ),
+    "develop": (
+        "You are in the DEVELOP phase. Brainstorm solution approaches, compare trade-offs, "
+        "and combine ideas into stronger directions. Keep responses concise and purposeful."
+    ),
+    "deliver": (
+        "You are in the DELIVER phase. Converge on an actionable plan, outline next steps, "
+        "and highlight metrics or validation steps. End with any risks or asks."
+    ),
+}
+DEFAULT_PHASE_PROMPT = "Drive the conversation forward with clarity and focus. Respond succinctly."
+
+
+@lru_cache(maxsize=16)
 def phase_prompt(phase_name: str) -> str:
-    prompts = {
-        "discover": (
-            "You are facilitating the DISCOVER phase. Focus on gathering observations, "
-            "user pains, and unmet needs. Encourage clarifying questions and avoid jumping "
-            "to solutions yet."
-        ),
-        "define": (
-            "You are in the DEFINE phase. Summarize insights, frame the problem crisply, "
-            "and push the team toward a shared articulation of the target outcome."
-        ),
-        "develop": (
-            "You are in the DEVELOP phase. Brainstorm solution approaches, compare trade-offs, "
-            "and combine ideas into stronger directions. Keep responses concise and purposeful."
-        ),
-        "deliver": (
-            "You are in the DELIVER phase. Converge on an actionable plan, outline next steps, "
-            "and highlight metrics or validation steps. End with any risks or asks."
-        ),
-    }
-    return prompts.get(
-        phase_name,
-        "Drive the conversation forward with clarity and focus. Respond succinctly.",
-    )
+    return PHASE_PROMPTS.get(phase_name, DEFAULT_PHASE_PROMPT)
@@ -1,66 +1,235 @@
 import asyncio
+import logging
+import os
 import time
-from collections import defaultdict
-from typing import Any, Dict, Set
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import msgpack
+import orjson
+from redis import asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+# Backoff bounds for re-establishing a session's subscription after Redis drops it
+PUMP_RETRY_MIN_SEC = 0.5
+PUMP_RETRY_MAX_SEC = 10.0
+
+
+def to_msgpack(data: bytes) -> bytes:
+    """Re-encode a JSON event as msgpack for clients on the `msgpack` subprotocol."""
+
+    return msgpack.packb(orjson.loads(data), use_bin_type=True)
+
+
+class SessionChannel:
+    """Shared ring of recent events for one session.
+
+    Every event is stored once, already JSON-encoded so all connections share one encode;
+    readers track their own position in the sequence. A reader that falls more than `maxlen`
+    events behind skips ahead to the oldest retained event (drop-oldest, as with the old
+    per-listener bounded queues). The msgpack form is built lazily, at most once per event,
+    the first time a msgpack reader reaches it.
+    """
+
+    def __init__(self, maxlen: int = 200) -> None:
+        self.msgs: Deque[bytes] = deque(maxlen=maxlen)
+        self.packed: Deque[Optional[bytes]] = deque(maxlen=maxlen)
+        self.seq = 0  # sequence number the next appended event will get
+        # One event per generation: publish sets the current one and swaps in a fresh one, so
+        # waking readers never takes a lock and costs O(1) regardless of how many are waiting.
+        self.wakeup = asyncio.Event()
+        self.readers = 0
+
+    def publish(self, message: bytes) -> None:
+        self.msgs.append(message)
+        self.packed.append(None)
+        self.seq += 1
+        wakeup, self.wakeup = self.wakeup, asyncio.Event()
+        wakeup.set()
+
+    def packed_at(self, offset: int) -> bytes:
+        data = self.packed[offset]
+        if data is None:
+            data = self.packed[offset] = to_msgpack(self.msgs[offset])
+        return data
+
+
+class ChannelReader:
+    """Cursor into a SessionChannel; `get()` waits for the next unseen event."""
+
+    def __init__(self, channel: SessionChannel, *, packed: bool = False) -> None:
+        self.channel = channel
+        self.packed = packed
+        self._cursor = channel.seq
+
+    async def get(self) -> bytes:
+        channel = self.channel
+        while self._cursor >= channel.seq:
+            await channel.wakeup.wait()
+        oldest = channel.seq - len(channel.msgs)
+        if self._cursor < oldest:
+            self._cursor = oldest
+        offset = self._cursor - oldest
+        self._cursor += 1
+        return channel.packed_at(offset) if self.packed else channel.msgs[offset]
+
+    async def get_batch(self, limit: int = 64) -> List[bytes]:
+        """Wait for one unseen event, then return all that are already buffered (up to `limit`)."""
+
+        channel = self.channel
+        while self._cursor >= channel.seq:
+            await channel.wakeup.wait()
+        oldest = channel.seq - len(channel.msgs)
+        if self._cursor < oldest:
+            self._cursor = oldest
+        start = self._cursor - oldest
+        stop = min(channel.seq - oldest, start + limit)
+        self._cursor = oldest + stop
+        if self.packed:
+            return [channel.packed_at(offset) for offset in range(start, stop)]
+        return [channel.msgs[offset] for offset in range(start, stop)]
 
 
 class SessionBroadcaster:
-    """Manages per-session event queues for WebSocket consumers."""
-
-    def __init__(self) -> None:
-        self._listeners: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
-        self._lock = asyncio.Lock()
-
-    async def register(self, session_id: str) -> asyncio.Queue:
-        queue: asyncio.Queue = asyncio.Queue(maxsize=200)
-        async with self._lock:
-            self._listeners[session_id].add(queue)
-        return queue
-
-    async def unregister(self, session_id: str, queue: asyncio.Queue) -> None:
-        async with self._lock:
-            listeners = self._listeners.get(session_id)
-            if not listeners:
-                return
-            listeners.discard(queue)
-            if not listeners:
-                self._listeners.pop(session_id, None)
-
-    async def emit(self, session_id: str, event_type: str, payload: Dict[str, Any]) -> None:
-        listeners: Set[asyncio.Queue]
-        async with self._lock:
-            listeners = set(self._listeners.get(session_id, set()))
-
-        if not listeners:
+    """Fans session events out to WebSocket consumers on every worker via Redis pub/sub.
+
+    Events are published to `session:{sid}:events`. Each worker holds one subscription per
+    session it has readers for and pumps what arrives into a local SessionChannel, so N
+    sockets on a worker still share a single subscription and a single encoded copy.
+    """
+
+    def __init__(self, redis_url: str = REDIS_URL) -> None:
+        self._redis = aioredis.from_url(redis_url)
+        self._channels: Dict[str, SessionChannel] = {}
+        self._pumps: Dict[str, "asyncio.Future[None]"] = {}
+
+    @staticmethod
+    def channel_name(session_id: str) -> str:
+        return f"session:{session_id}:events"
+
+    async def register(self, session_id: str, *, packed: bool = False) -> ChannelReader:
+        channel = self._channels.get(session_id)
+        if channel is None:
+            channel = self._channels[session_id] = SessionChannel()
+        # Counted before any await so a concurrent unregister cannot retire the channel under us
+        channel.readers += 1
+        pump = self._pumps.get(session_id)
+        if pump is None or pump.done():
+            # (Re)start the pump; the placeholder stops concurrent registrants subscribing twice
+            placeholder = self._pumps[session_id] = asyncio.get_running_loop().create_future()
+            try:
+                pubsub = await self._subscribe(session_id)
+            except Exception:
+                if not placeholder.done():
+                    placeholder.set_result(None)
+                channel.readers -= 1
+                if channel.readers <= 0 and self._channels.get(session_id) is channel:
+                    self._channels.pop(session_id, None)
+                    self._pumps.pop(session_id, None)
+                raise
+            self._pumps[session_id] = asyncio.create_task(self._pump(session_id, pubsub, channel))
+            if not placeholder.done():
+                placeholder.set_result(None)
+        return ChannelReader(channel, packed=packed)
+
+    async def unregister(self, session_id: str, reader: ChannelReader) -> None:
+        channel = self._channels.get(session_id)
+        if channel is None or channel is not reader.channel:
             return
+        channel.readers -= 1
+        if channel.readers <= 0:
+            self._channels.pop(session_id, None)
+            pump = self._pumps.pop(session_id, None)
+            if pump:
+                pump.cancel()
 
-        message = {
-            "session_id": session_id,
-            "event": event_type,
-            "payload": payload,
-            "ts": time.time(),
-        }
+    async def _subscribe(self, session_id: str) -> Any:
+        pubsub = self._redis.pubsub()
+        try:
+            await pubsub.subscribe(self.channel_name(session_id))
+        except BaseException:
+            await pubsub.aclose()
+            raise
+        return pubsub
 
-        for queue in listeners:
+    async def _pump(self, session_id: str, pubsub: Any, channel: SessionChannel) -> None:
+        """Feed the local channel from Redis, resubscribing with backoff until cancelled."""
+
+        while True:
             try:
-                queue.put_nowait(message)
-            except asyncio.QueueFull:
-                # drop oldest to make room
-                try:
-                    queue.get_nowait()
-                except asyncio.QueueEmpty:
-                    pass
+                async for item in pubsub.listen():
+                    if item["type"] == "message":
+                        channel.publish(item["data"])
+                logger.warning("Event subscription for session %s ended; resubscribing", session_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Event subscription for session %s failed", session_id)
+            finally:
+                await pubsub.aclose()
+
+            delay = PUMP_RETRY_MIN_SEC
+            while True:
+                await asyncio.sleep(delay)
                 try:
-                    queue.put_nowait(message)
-                except asyncio.QueueFull:
-                    # still full; skip this listener
-                    continue
+                    pubsub = await self._subscribe(session_id)
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    delay = min(delay * 2, PUMP_RETRY_MAX_SEC)
+                    logger.warning(
+                        "Resubscribe for session %s failed (%s); retrying in %.1fs",
+                        session_id,
+                        exc,
+                        delay,
+                    )
+
+    @staticmethod
+    def envelope(session_id: str, event_type: str) -> Dict[str, Any]:
+        """Static part of an event, for callers that emit the same event type many times."""
+
+        return {"session_id": session_id, "event": event_type}
+
+    @staticmethod
+    def encode(
+        session_id: str,
+        event_type: str,
+        payload: Dict[str, Any],
+        *,
+        envelope: Optional[Dict[str, Any]] = None,
+    ) -> bytes:
+        """Wire form of an event; lets callers PUBLISH it inside their own Redis pipeline."""
+
+        if envelope is not None:
+            message = {**envelope, "payload": payload, "ts": time.time()}
+        else:
+            message = {
+                "session_id": session_id,
+                "event": event_type,
+                "payload": payload,
+                "ts": time.time(),
+            }
+        return orjson.dumps(message)
+
+    async def emit(
+        self,
+        session_id: str,
+        event_type: str,
+        payload: Dict[str, Any],
+        *,
+        envelope: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        data = self.encode(session_id, event_type, payload, envelope=envelope)
+        await self._redis.publish(self.channel_name(session_id), data)
 
     async def close_session(self, session_id: str) -> None:
-        async with self._lock:
-            listeners = self._listeners.pop(session_id, set())
-        for queue in listeners:
-            queue.put_nowait({"event": "session.closed", "session_id": session_id, "payload": {}})
+        await self._redis.publish(
+            self.channel_name(session_id),
+            orjson.dumps({"event": "session.closed", "session_id": session_id, "payload": {}}),
+        )
 
 
 session_broadcaster = SessionBroadcaster()
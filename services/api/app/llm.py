@@ -17,6 +17,13 @@ for env_key in LITELLM_ENV_KEYS:
     os.environ.setdefault(env_key, OLLAMA_URL)
 
 
+def _sync_litellm_env() -> None:
+    # os.environ writes call putenv(); skip them when the value is already current.
+    for env_key in LITELLM_ENV_KEYS:
+        if os.environ.get(env_key) != OLLAMA_URL:
+            os.environ[env_key] = OLLAMA_URL
+
+
 def get_llm(model_hint: str | None = None) -> str:
     """
     CrewAI 0.60 expects the `llm` passed to Agent(...) to be either a provider string
@@ -26,7 +33,5 @@ def get_llm(model_hint: str | None = None) -> str:
     model = model_hint or DEFAULT_MODEL
 
     # Keep environment values fresh at call-time in case they were modified elsewhere.
-    for env_key in LITELLM_ENV_KEYS:
-        os.environ[env_key] = OLLAMA_URL
-
+    _sync_litellm_env()
     return f"ollama/{model}"
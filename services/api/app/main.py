@@ -1,26 +1,70 @@
 import asyncio
-import datetime as dt
+import logging
 import os
-from typing import Any, Dict, Optional
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Literal, Optional, Set, Tuple
+from weakref import WeakValueDictionary
 
 import httpx
+import orjson
 from crewai import Crew
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
 from redis import asyncio as aioredis
 
 from .agents import make_moderator, make_notetaker, make_participant, simple_task
-from .db import init_db
+from .db import close_pool, init_db, init_pool
 from .engine import repo as engine_repo
 from .engine.session_engine import SessionEngine
-from .engine.ws import session_broadcaster
+from .engine.ws import session_broadcaster, to_msgpack
+from .schemas import AgentIn, NotepadIn, SessionIn
 
-app = FastAPI(title="Crew Talk API")
+logger = logging.getLogger(__name__)
+
+MSGPACK_SUBPROTOCOL = "msgpack"
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+redis_client = aioredis.from_url(REDIS_URL, decode_responses=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Schema bootstrap (sync SQLAlchemy, in a thread), asyncpg pool and Redis connection warm-up
+    # are independent, so cold start waits for the slowest rather than their sum.
+    await asyncio.gather(asyncio.to_thread(init_db), init_pool(), redis_client.ping())
+    engine_repo.start_message_writer()
+    # One pooled client for outbound Ollama calls. HTTP/2 is negotiated over TLS (an https
+    # OLLAMA_URL behind a proxy) and multiplexes concurrent requests; plain http stays on 1.1.
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(3.0, read=30.0),
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=30),
+    )
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        await engine_repo.stop_message_writer()
+        await close_pool()
+
+
+class FrozenOriginCORSMiddleware(CORSMiddleware):
+    """CORSMiddleware that checks its explicit origin allowlist as a frozenset."""
+
+    def __init__(self, app: Any, **kwargs: Any) -> None:
+        super().__init__(app, **kwargs)
+        self.allow_origins = frozenset(self.allow_origins)
+
+
+app = FastAPI(title="Crew Talk API", lifespan=lifespan)
 
 # CORS
 raw_origins = os.getenv("CORS_ORIGIN", "*")
-origin_tokens = [token.strip() for token in raw_origins.split(",") if token.strip() and token.strip() != "*"]
+origin_tokens = [
+    token for token in (raw.strip() for raw in raw_origins.split(",")) if token and token != "*"
+]
 cors_kwargs: dict[str, Any] = {
     "allow_methods": ["*"],
     "allow_headers": ["*"],
@@ -31,73 +75,126 @@ if origin_tokens:
 else:
     cors_kwargs["allow_origins"] = []
     cors_kwargs["allow_origin_regex"] = r"https?://.*"
-app.add_middleware(CORSMiddleware, **cors_kwargs)
-
+app.add_middleware(FrozenOriginCORSMiddleware, **cors_kwargs)
 
-REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
-redis_client = aioredis.from_url(REDIS_URL, decode_responses=True)
 
+# LRU of engines by session id. Only idle/finished engines are evicted; a live or starting engine
+# owns the session's orchestration task, so it stays regardless of the bound.
+ENGINE_CACHE_SIZE = int(os.getenv("ENGINE_CACHE_SIZE", "512"))
+ENGINE_CACHE: "OrderedDict[str, SessionEngine]" = OrderedDict()
 
-@app.on_event("startup")
-async def _startup() -> None:
-    init_db()
 
-
-class SessionIn(BaseModel):
-    title: str
-    problem_statement: str
-    time_limit_sec: int = 900
-    strategy: str = "double_diamond"
-
-
-class AgentIn(BaseModel):
-    name: str
-    role: str  # moderator|participant|notetaker
-    trait: str = ""
-    model_hint: str | None = None
+def get_engine(session_id: str) -> SessionEngine:
+    # No await between lookup and insert, so concurrent requests cannot build two engines
+    engine = ENGINE_CACHE.get(session_id)
+    if engine is not None:
+        ENGINE_CACHE.move_to_end(session_id)
+        return engine
+    _evict_idle_engines()
+    engine = ENGINE_CACHE[session_id] = SessionEngine(session_id)
+    return engine
 
 
-class NotepadIn(BaseModel):
-    content: str
-    updated_by: str | None = None
+def _evict_idle_engines() -> None:
+    # Make room for one more engine by dropping the least recently used idle ones
+    excess = len(ENGINE_CACHE) + 1 - ENGINE_CACHE_SIZE
+    if excess <= 0:
+        return
+    for sid in [sid for sid, engine in ENGINE_CACHE.items() if engine.can_evict][:excess]:
+        del ENGINE_CACHE[sid]
 
 
-ENGINE_CACHE: Dict[str, SessionEngine] = {}
+# Sessions are never deleted, so a positive existence check stays true; the TTL only keeps the
+# map small and lets a recreated database be noticed. Misses are never cached.
+SESSION_EXISTS_TTL_SEC = 5.0
+SESSION_EXISTS_CACHE_SIZE = 1024
+_KNOWN_SESSIONS: "OrderedDict[str, float]" = OrderedDict()
 
 
-def get_engine(session_id: str) -> SessionEngine:
-    engine = ENGINE_CACHE.get(session_id)
-    if not engine:
-        engine = SessionEngine(session_id)
-        ENGINE_CACHE[session_id] = engine
-    return engine
+def _remember_session(session_id: str) -> None:
+    _KNOWN_SESSIONS[session_id] = time.monotonic() + SESSION_EXISTS_TTL_SEC
+    _KNOWN_SESSIONS.move_to_end(session_id)
+    if len(_KNOWN_SESSIONS) > SESSION_EXISTS_CACHE_SIZE:
+        _KNOWN_SESSIONS.popitem(last=False)
 
 
 async def ensure_session_or_404(session_id: str) -> Dict[str, Any]:
     record = await engine_repo.get_session(session_id)
     if not record:
+        _KNOWN_SESSIONS.pop(session_id, None)
         raise HTTPException(status_code=404, detail=f"Session '{session_id}' not found")
+    _remember_session(session_id)
     return record
 
 
+async def ensure_session_exists(session_id: str) -> None:
+    """404 check for endpoints that only need the session to exist, not its current row."""
+
+    expires = _KNOWN_SESSIONS.get(session_id)
+    if expires is not None and expires > time.monotonic():
+        return
+    await ensure_session_or_404(session_id)
+
+
 def notepad_key(session_id: str) -> str:
     return f"session:{session_id}:notepad"
 
 
+async def redis_pipeline_notepad(
+    session_id: str, content: str, event_payload: Dict[str, Any]
+) -> None:
+    """SET the live notepad and PUBLISH `notepad.updated` in a single non-transactional flush."""
+
+    event = session_broadcaster.encode(session_id, "notepad.updated", event_payload)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.set(notepad_key(session_id), content)
+        pipe.publish(session_broadcaster.channel_name(session_id), event)
+        await pipe.execute()
+    _cache_notepad(session_id, content)
+
+
+# Per-process copy of the live notepad for polling dashboards; update_notepad refreshes it, the
+# TTL bounds staleness for writes made through other workers.
+NOTEPAD_CACHE_TTL_SEC = 1.0
+NOTEPAD_CACHE_SIZE = 1024
+_NOTEPAD_CACHE: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+
+
+def _cache_notepad(session_id: str, content: Optional[str]) -> None:
+    _NOTEPAD_CACHE[session_id] = (time.monotonic(), content)
+    _NOTEPAD_CACHE.move_to_end(session_id)
+    if len(_NOTEPAD_CACHE) > NOTEPAD_CACHE_SIZE:
+        _NOTEPAD_CACHE.popitem(last=False)
+
+
+async def get_live_notepad(session_id: str) -> Optional[str]:
+    cached = _NOTEPAD_CACHE.get(session_id)
+    if cached and time.monotonic() - cached[0] < NOTEPAD_CACHE_TTL_SEC:
+        return cached[1]
+    content = await redis_client.get(notepad_key(session_id))
+    if content is None:
+        # Redis is the live copy; fall back to the persisted current row (never-edited sessions
+        # have neither, and caching that None keeps them from querying Postgres every poll)
+        current = await engine_repo.get_current_notepad(session_id)
+        content = current["content"] if current else None
+    _cache_notepad(session_id, content)
+    return content
+
+
 @app.get("/health/ollama")
-async def health_ollama():
+async def health_ollama(request: Request):
     base = os.getenv("OLLAMA_URL", "http://ollama:11434")
     url = base.rstrip("/") + "/api/tags"
     try:
-        async with httpx.AsyncClient(timeout=3.0) as client:
-            r = await client.get(url)
-            ok = r.status_code == 200
-            return {
-                "ok": ok,
-                "ollama_url": base,
-                "status": r.status_code,
-                "body": r.json() if ok else r.text,
-            }
+        # Keep the probe's 3s budget; the client's 30s read timeout is meant for generation calls
+        r = await request.app.state.http.get(url, timeout=3.0)
+        ok = r.status_code == 200
+        return {
+            "ok": ok,
+            "ollama_url": base,
+            "status": r.status_code,
+            "body": r.json() if ok else r.text,
+        }
     except Exception as exc:
         detail = str(exc) or repr(exc)
         return {"ok": False, "ollama_url": base, "error": detail}
@@ -111,91 +208,167 @@ async def create_session(body: SessionIn):
         body.time_limit_sec,
         body.strategy,
     )
+    _remember_session(str(record["id"]))
     return {"id": record["id"], "phase": record["phase"], "status": record["status"]}
 
 
-@app.post("/sessions/{sid}/agents")
-async def add_agent(sid: str, body: AgentIn):
-    await ensure_session_or_404(sid)
+def _crew_agent(body: AgentIn):
     if body.role == "moderator":
-        agent = make_moderator(model_hint=body.model_hint)
-    elif body.role == "notetaker":
-        agent = make_notetaker(model_hint=body.model_hint)
-    else:
-        agent = make_participant(body.name, body.trait, model_hint=body.model_hint)
+        return make_moderator(model_hint=body.model_hint)
+    if body.role == "notetaker":
+        return make_notetaker(model_hint=body.model_hint)
+    return make_participant(body.name, body.trait, model_hint=body.model_hint)
+
 
+async def _run_probe(agent) -> str:
     task = simple_task(agent, "Reply 'ready' if you can hear me.")
     probe_crew = Crew(agents=[agent], tasks=[task])
+    # kickoff() blocks on the LLM call; run it off the event loop so streams keep flowing
+    probe_output = await asyncio.to_thread(probe_crew.kickoff)
+    return str(probe_output)[:200]
+
+
+# Strong references to in-flight background probes so they are not garbage collected mid-run
+_PROBE_TASKS: Set[asyncio.Task] = set()
+
+
+async def _probe_in_background(sid: str, agent_id: str, agent) -> None:
     try:
-        probe_output = probe_crew.kickoff()
+        snippet = await _run_probe(agent)
     except Exception as exc:
         detail = str(exc) or repr(exc)
-        raise HTTPException(status_code=502, detail=f"Agent probe failed: {detail}")
+        probe_status, is_active = "failed", False
+        payload = {"agent_id": agent_id, "ok": False, "error": detail}
+    else:
+        probe_status, is_active = "ok", True
+        payload = {"agent_id": agent_id, "ok": True, "probe": snippet}
+    try:
+        await engine_repo.set_agent_probe_result(agent_id, probe_status, is_active=is_active)
+    except Exception as exc:
+        # The agent row stays "pending"; still tell clients what the probe found
+        logger.exception("Failed to record probe result for agent %s", agent_id)
+        payload["persist_error"] = str(exc) or repr(exc)
+    try:
+        await session_broadcaster.emit(sid, "agent.probe.result", payload)
+    except Exception:
+        logger.exception("Failed to emit probe result for agent %s", agent_id)
+
+
+@app.post("/sessions/{sid}/agents")
+async def add_agent(
+    sid: str,
+    body: AgentIn,
+    response: Response,
+    probe: Literal["sync", "background", "off"] = "sync",
+):
+    await ensure_session_exists(sid)
+    agent = _crew_agent(body)
+
+    if probe == "sync":
+        try:
+            snippet = await _run_probe(agent)
+        except Exception as exc:
+            detail = str(exc) or repr(exc)
+            raise HTTPException(status_code=502, detail=f"Agent probe failed: {detail}")
+        probe_status = "ok"
+    else:
+        snippet = None
+        probe_status = "pending" if probe == "background" else "skipped"
 
-    await engine_repo.add_agent(
+    record = await engine_repo.add_agent(
         sid,
         body.name,
         body.role,
         body.trait or None,
         body.model_hint or None,
+        probe_status=probe_status,
     )
-    return {"ok": True, "probe": str(probe_output)[:200]}
+    agent_id = str(record["id"])
+
+    if probe == "background":
+        # Acknowledge now; the outcome arrives as `agent.probe.result` on the session stream
+        task = asyncio.create_task(_probe_in_background(sid, agent_id, agent))
+        _PROBE_TASKS.add(task)
+        task.add_done_callback(_PROBE_TASKS.discard)
+        response.status_code = 202
+
+    return {"ok": True, "agent_id": agent_id, "probe_status": probe_status, "probe": snippet}
+
+
+# One control transition per session at a time; duplicate clicks queue here instead of racing
+# into the engine. Entries vanish once no request holds the lock.
+_SID_LOCKS: "WeakValueDictionary[str, asyncio.Lock]" = WeakValueDictionary()
+
+
+def session_lock(session_id: str) -> asyncio.Lock:
+    lock = _SID_LOCKS.get(session_id)
+    if lock is None:
+        lock = _SID_LOCKS[session_id] = asyncio.Lock()
+    return lock
 
 
 @app.post("/sessions/{sid}/start")
 async def start_session(sid: str):
-    await ensure_session_or_404(sid)
-    engine = get_engine(sid)
-    await engine.start()
-    meta = await engine_repo.get_session(sid)
+    async with session_lock(sid):
+        meta = await ensure_session_or_404(sid)
+        engine = get_engine(sid)
+        if not engine.is_running:  # a repeated start is a no-op, not a second orchestrator
+            await engine.start()
+            meta = await engine_repo.get_session(sid)
     return {"ok": True, "phase": meta["phase"], "status": meta["status"]}
 
 
 @app.post("/sessions/{sid}/pause")
 async def pause_session(sid: str):
-    await ensure_session_or_404(sid)
-    engine = get_engine(sid)
-    await engine.pause()
-    meta = await engine_repo.get_session(sid)
+    async with session_lock(sid):
+        meta = await ensure_session_or_404(sid)
+        if meta["status"] != "paused":
+            await get_engine(sid).pause()
+            meta = await engine_repo.get_session(sid)
     return {"ok": True, "status": meta["status"]}
 
 
 @app.post("/sessions/{sid}/resume")
 async def resume_session(sid: str):
-    await ensure_session_or_404(sid)
-    engine = get_engine(sid)
-    await engine.resume()
-    meta = await engine_repo.get_session(sid)
+    async with session_lock(sid):
+        meta = await ensure_session_or_404(sid)
+        if meta["status"] != "running":
+            await get_engine(sid).resume()
+            meta = await engine_repo.get_session(sid)
     return {"ok": True, "status": meta["status"]}
 
 
 @app.post("/sessions/{sid}/stop")
 async def stop_session(sid: str):
-    await ensure_session_or_404(sid)
-    engine = get_engine(sid)
-    await engine.stop()
-    meta = await engine_repo.get_session(sid)
+    async with session_lock(sid):
+        meta = await ensure_session_or_404(sid)
+        if meta["status"] != "done":
+            await get_engine(sid).stop()
+            meta = await engine_repo.get_session(sid)
     return {"ok": True, "status": meta["status"]}
 
 
 @app.post("/sessions/{sid}/advance")
 async def advance_session(sid: str):
-    await ensure_session_or_404(sid)
-    engine = get_engine(sid)
-    await engine.advance_phase()
-    meta = await engine_repo.get_session(sid)
+    async with session_lock(sid):
+        await ensure_session_exists(sid)
+        engine = get_engine(sid)
+        await engine.advance_phase()
+        meta = await engine_repo.get_session(sid)
     return {"ok": True, "phase": meta["phase"], "status": meta["status"]}
 
 
 @app.post("/sessions/{sid}/notepad")
 async def update_notepad(sid: str, body: NotepadIn):
-    await ensure_session_or_404(sid)
-    await redis_client.set(notepad_key(sid), body.content)
-    await engine_repo.save_notepad_snapshot(sid, body.content, body.updated_by)
-    await session_broadcaster.emit(
-        sid,
-        "notepad.updated",
-        {"content": body.content, "updated_by": body.updated_by},
+    await ensure_session_exists(sid)
+    # Live copy + broadcast share one Redis round-trip; the persisted snapshot runs alongside
+    await asyncio.gather(
+        redis_pipeline_notepad(
+            sid,
+            body.content,
+            {"content": body.content, "updated_by": body.updated_by},
+        ),
+        engine_repo.save_notepad_snapshot(sid, body.content, body.updated_by),
     )
     return {"ok": True}
 
@@ -203,46 +376,58 @@ async def update_notepad(sid: str, body: NotepadIn):
 @app.websocket("/sessions/{sid}/stream")
 async def session_stream(sid: str, websocket: WebSocket):
     try:
-        await ensure_session_or_404(sid)
+        await ensure_session_exists(sid)
     except HTTPException:
         await websocket.close(code=4040)
         return
 
-    await websocket.accept()
+    # Clients may negotiate the compact `msgpack` subprotocol; everyone else gets JSON frames
+    packed = MSGPACK_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+    await websocket.accept(subprotocol=MSGPACK_SUBPROTOCOL if packed else None)
 
-    initial_meta = await engine_repo.get_session(sid)
-    if initial_meta:
-        await websocket.send_json(
-            {
+    engine = ENGINE_CACHE.get(sid)
+    if engine is not None and engine.is_running:
+        # A live engine in this worker holds fresher state than the row, already encoded
+        frame = engine.status_frame()
+        await websocket.send_bytes(to_msgpack(frame) if packed else frame)
+    else:
+        initial_status = await engine_repo.get_session_status_lite(sid)
+        if initial_status:
+            status, phase, turn_index, deadline = initial_status
+            event = {
                 "event": "session.status",
                 "session_id": sid,
                 "payload": {
-                    "status": initial_meta["status"],
-                    "phase": initial_meta["phase"],
-                    "turn_index": initial_meta["turn_index"],
-                    "deadline": initial_meta.get("deadline"),
+                    "status": status,
+                    "phase": phase,
+                    "turn_index": turn_index,
+                    "deadline": deadline,
                 },
-                "ts": dt.datetime.utcnow().timestamp(),
+                "ts": time.time(),
             }
-        )
+            frame = orjson.dumps(event)
+            await websocket.send_bytes(to_msgpack(frame) if packed else frame)
 
-    queue = await session_broadcaster.register(sid)
+    reader = await session_broadcaster.register(sid, packed=packed)
     try:
         while True:
-            event = await queue.get()
-            await websocket.send_json(event)
+            # Drain whatever piled up while the last send was in flight before waiting again
+            for frame in await reader.get_batch():
+                await websocket.send_bytes(frame)
     except WebSocketDisconnect:
         pass
     finally:
-        await session_broadcaster.unregister(sid, queue)
+        await session_broadcaster.unregister(sid, reader)
 
 
 @app.get("/sessions/{sid}")
-async def get_session_detail(sid: str):
+async def get_session_detail(sid: str, after_id: Optional[int] = None):
     session_row = await ensure_session_or_404(sid)
-    agents = await engine_repo.list_agents(sid)
-    turns = await engine_repo.recent_messages(sid, limit=50)
-    notepad = await redis_client.get(notepad_key(sid))
+    agents, turns, notepad = await asyncio.gather(
+        engine_repo.list_agents(sid),
+        engine_repo.recent_messages(sid, limit=50, after_id=after_id),
+        get_live_notepad(sid),
+    )
     return {
         "id": session_row["id"],
         "title": session_row["title"],
@@ -259,8 +444,10 @@ async def get_session_detail(sid: str):
 
 @app.get("/sessions/{sid}/export")
 async def export_session(sid: str):
-    await ensure_session_or_404(sid)
-    payload = await engine_repo.export_session(sid)
-    latest_notepad = await redis_client.get(notepad_key(sid))
+    await ensure_session_exists(sid)
+    payload, latest_notepad = await asyncio.gather(
+        engine_repo.export_session(sid),
+        get_live_notepad(sid),
+    )
     payload["notepad_latest"] = latest_notepad or ""
     return payload
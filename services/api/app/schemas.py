@@ -0,0 +1,30 @@
+from pydantic import BaseModel, ConfigDict
+
+# Request bodies are read-only once parsed; unknown keys are rejected up front instead of
+# being carried through validation and silently dropped.
+_REQUEST_CONFIG = ConfigDict(extra="forbid", frozen=True)
+
+
+class SessionIn(BaseModel):
+    model_config = _REQUEST_CONFIG
+
+    title: str
+    problem_statement: str
+    time_limit_sec: int = 900
+    strategy: str = "double_diamond"
+
+
+class AgentIn(BaseModel):
+    model_config = _REQUEST_CONFIG
+
+    name: str
+    role: str  # moderator|participant|notetaker
+    trait: str = ""
+    model_hint: str | None = None
+
+
+class NotepadIn(BaseModel):
+    model_config = _REQUEST_CONFIG
+
+    content: str
+    updated_by: str | None = None